@@ -1,17 +1,22 @@
 """PatchPal - An open-source Claude Code clone implemented purely in Python."""
 
+import importlib
+
 __version__ = "0.24.1"
 
-from patchpal.agent import create_agent, create_react_agent
-from patchpal.cli.autopilot import autopilot_loop
-from patchpal.tools import (
-    edit_file,
-    read_file,
-    run_shell,
-    web_fetch,
-    web_search,
-    write_file,
-)
+# Public API, imported on first access (PEP 562) so that importing a submodule such as
+# patchpal.tools does not also load the agent and litellm
+_LAZY_EXPORTS = {
+    "read_file": "patchpal.tools",
+    "edit_file": "patchpal.tools",
+    "write_file": "patchpal.tools",
+    "web_search": "patchpal.tools",
+    "web_fetch": "patchpal.tools",
+    "run_shell": "patchpal.tools",
+    "create_agent": "patchpal.agent",
+    "create_react_agent": "patchpal.agent",
+    "autopilot_loop": "patchpal.cli.autopilot",
+}
 
 __all__ = [
     "read_file",
@@ -24,3 +29,13 @@ __all__ = [
     "create_react_agent",
     "autopilot_loop",
 ]
+
+
+def __getattr__(name):
+    """Import a public API name from its defining module on first access."""
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value  # Later lookups skip __getattr__
+    return value
@@ -52,6 +52,7 @@ class StreamRenderer:
 
         self._running = False
         self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
         self._token_count = 0
         self._start_time = 0.0
         self._first_token_time: Optional[float] = None
@@ -68,6 +69,7 @@ class StreamRenderer:
         self._first_token_time = None
         self._token_count = 0
         self._spinner_index = 0
+        self._stop_event.clear()
 
         # Start background thread for spinner animation
         self._thread = threading.Thread(target=self._render_loop, daemon=True)
@@ -84,6 +86,7 @@ class StreamRenderer:
             return
 
         self._running = False
+        self._stop_event.set()
 
         # Wait for thread to finish
         if self._thread:
@@ -118,7 +121,8 @@ class StreamRenderer:
         """Background thread that updates the spinner."""
         while self._running:
             self._render()
-            time.sleep(self.UPDATE_INTERVAL)
+            # Sleep until the next frame, but wake immediately when stop() is called
+            self._stop_event.wait(self.UPDATE_INTERVAL)
 
     def _render(self):
         """Render the current status line."""
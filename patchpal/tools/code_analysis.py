@@ -4,18 +4,16 @@ This module provides tools to analyze code structure without reading full files,
 significantly reducing token usage for large codebases.
 """
 
+import importlib.util
 from pathlib import Path
-from typing import Dict, List, Optional
-
-try:
-    from tree_sitter_language_pack import get_parser
-
-    TREE_SITTER_AVAILABLE = True
-except ImportError:
-    TREE_SITTER_AVAILABLE = False
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from patchpal.tools.common import _check_path, _operation_limiter, audit_logger
 
+# Tree-sitter is only checked for here, and imported by _get_parser on first use
+# since loading the language pack is slow
+TREE_SITTER_AVAILABLE = importlib.util.find_spec("tree_sitter_language_pack") is not None
+
 # Language mapping from file extensions
 LANGUAGE_MAP = {
     "py": "python",
@@ -46,6 +44,9 @@ LANGUAGE_MAP = {
     "exs": "elixir",
 }
 
+# File extensions (without dot) that code_structure can parse
+SUPPORTED_EXTENSIONS = frozenset(LANGUAGE_MAP)
+
 # Node types for different languages
 FUNCTION_NODE_TYPES = {
     "python": ["function_definition"],
@@ -76,6 +77,13 @@ CLASS_NODE_TYPES = {
 }
 
 
+def _get_parser(language_name: str):
+    """Return a tree-sitter parser for language_name, importing the language pack lazily."""
+    from tree_sitter_language_pack import get_parser
+
+    return get_parser(language_name)
+
+
 def code_structure(path: str, max_symbols: int = 50, _internal_call: bool = False) -> str:
     """
     Analyze code structure using tree-sitter AST parsing.
@@ -132,7 +140,7 @@ def code_structure(path: str, max_symbols: int = 50, _internal_call: bool = Fals
 
     try:
         # Get parser for language
-        parser = get_parser(language_name)
+        parser = _get_parser(language_name)
 
         # Read and parse file
         with open(resolved_path, "rb") as f:
@@ -151,7 +159,7 @@ def code_structure(path: str, max_symbols: int = 50, _internal_call: bool = Fals
 
     except Exception as e:
         # Fallback to basic info if parsing fails
-        audit_logger.warning(f"CODE_STRUCTURE failed for {path}: {e}")
+        audit_logger.warning("CODE_STRUCTURE failed for %s: %s", path, e)
         return _basic_file_info(resolved_path, path) + f"\n\n⚠️  Tree-sitter parsing failed: {e}"
 
 
@@ -217,16 +225,13 @@ def _get_identifier(node, field_name: str, source: bytes) -> Optional[str]:
     return None
 
 
-def _format_output(
-    resolved_path: Path, display_path: str, symbols: List[Dict], max_symbols: int, source: bytes
-) -> str:
-    """Format symbols into human-readable output."""
-    lines = []
+def _symbol_sections(symbols: List[Dict], max_symbols: int) -> List[Tuple[str, List[str]]]:
+    """Group symbols into (header, lines) sections for display.
 
-    # File header
-    line_count = source.decode("utf-8", errors="ignore").count("\n") + 1
-    size_kb = len(source) / 1024
-    lines.append(f"File: {display_path} ({line_count:,} lines, {size_kb:.1f} KB)\n")
+    Shared by code_structure's formatter and get_repo_map so both render from
+    the extracted symbols instead of re-parsing formatted text.
+    """
+    sections = []
 
     # Group symbols
     classes = [s for s in symbols if s["type"] == "class" and s["depth"] == 0]
@@ -235,9 +240,9 @@ def _format_output(
 
     # Show classes with their methods
     if classes:
-        lines.append(f"\nClasses ({len(classes)}):")
+        class_lines = []
         for cls in classes[: max_symbols // 2]:
-            lines.append(f"  Line {cls['line']:4d}: class {cls['name']}")
+            class_lines.append(f"  Line {cls['line']:4d}: class {cls['name']}")
             # Find methods for this class
             class_line = cls["line"]
             next_class_line = (
@@ -251,17 +256,38 @@ def _format_output(
                 if m["line"] > class_line and m["line"] < next_class_line and m["depth"] == 1
             ]
             for method in class_methods[:10]:  # Max 10 methods per class
-                lines.append(f"           {method['line']:4d}:   {method['signature'][:80]}")
+                class_lines.append(f"           {method['line']:4d}:   {method['signature'][:80]}")
+        sections.append((f"Classes ({len(classes)}):", class_lines))
 
     # Show top-level functions
     if functions:
-        lines.append(f"\nFunctions ({len(functions)}):")
-        for func in functions[: max_symbols // 2]:
-            lines.append(f"  Line {func['line']:4d}: {func['signature'][:90]}")
+        function_lines = [
+            f"  Line {func['line']:4d}: {func['signature'][:90]}"
+            for func in functions[: max_symbols // 2]
+        ]
+        sections.append((f"Functions ({len(functions)}):", function_lines))
 
     # Summary
     if not classes and not functions:
-        lines.append("\n(No functions or classes found)")
+        sections.append(("(No functions or classes found)", []))
+
+    return sections
+
+
+def _format_output(
+    resolved_path: Path, display_path: str, symbols: List[Dict], max_symbols: int, source: bytes
+) -> str:
+    """Format symbols into human-readable output."""
+    lines = []
+
+    # File header
+    line_count = source.decode("utf-8", errors="ignore").count("\n") + 1
+    size_kb = len(source) / 1024
+    lines.append(f"File: {display_path} ({line_count:,} lines, {size_kb:.1f} KB)\n")
+
+    for header, section_lines in _symbol_sections(symbols, max_symbols):
+        lines.append(f"\n{header}")
+        lines.extend(section_lines)
 
     # Add helpful hint
     lines.append(f"\n💡 Use read_lines('{display_path}', start, end) to read specific sections.")
@@ -269,6 +295,51 @@ def _format_output(
     return "\n".join(lines)
 
 
+def _code_structure_lines(path: str, max_symbols: int = 50) -> Optional[Iterator[str]]:
+    """Return the symbol lines of code_structure without the header, hints, or blank lines.
+
+    This is the compact form used by get_repo_map. It does not count toward the
+    operation limit.
+
+    Args:
+        path: File path to analyze (relative or absolute)
+        max_symbols: Maximum number of symbols to include (default: 50)
+
+    Returns:
+        Iterator over section headers and symbol lines, or None if the file
+        cannot be analyzed
+
+    Raises:
+        ValueError: If the path is invalid or outside the allowed locations
+    """
+    if not TREE_SITTER_AVAILABLE:
+        return None
+
+    resolved_path = _check_path(path, must_exist=True)
+    language_name = LANGUAGE_MAP.get(resolved_path.suffix.lstrip("."))
+    if not language_name:
+        return iter(())
+
+    try:
+        with open(resolved_path, "rb") as f:
+            source = f.read()
+    except OSError:
+        return None
+
+    try:
+        tree = _get_parser(language_name).parse(source)
+        symbols = _extract_symbols(tree.root_node, language_name, source)
+    except Exception as e:
+        audit_logger.warning("CODE_STRUCTURE failed for %s: %s", path, e)
+        return iter((f"⚠️  Tree-sitter parsing failed: {e}",))
+
+    return (
+        line
+        for header, section_lines in _symbol_sections(symbols, max_symbols)
+        for line in (header, *section_lines)
+    )
+
+
 def _basic_file_info(resolved_path: Path, display_path: str) -> str:
     """Return basic file info when tree-sitter is unavailable or fails."""
     try:
@@ -1,15 +1,18 @@
 """Tools with security guardrails for safe code modification."""
 
 import difflib
+import importlib.util
 import logging
 import mimetypes
 import os
 import platform
+import re
 import shutil
 import subprocess
 from datetime import datetime
-from pathlib import Path
-from typing import Optional
+from functools import lru_cache
+from pathlib import Path, PurePath
+from typing import List, Optional
 
 from patchpal.permissions import PermissionManager
 
@@ -19,26 +22,11 @@ except ImportError:
     # Fall back to old package name if new one not installed
     pass
 
-try:
-    import pymupdf  # noqa: F401
-
-    PYMUPDF_AVAILABLE = True
-except ImportError:
-    PYMUPDF_AVAILABLE = False
-
-try:
-    import docx  # noqa: F401
-
-    PYTHON_DOCX_AVAILABLE = True
-except ImportError:
-    PYTHON_DOCX_AVAILABLE = False
-
-try:
-    import pptx  # noqa: F401
-
-    PYTHON_PPTX_AVAILABLE = True
-except ImportError:
-    PYTHON_PPTX_AVAILABLE = False
+# Optional document extraction libraries: only checked for here, and imported by the
+# extract_text_from_* functions on first use since they are slow to import
+PYMUPDF_AVAILABLE = importlib.util.find_spec("pymupdf") is not None
+PYTHON_DOCX_AVAILABLE = importlib.util.find_spec("docx") is not None
+PYTHON_PPTX_AVAILABLE = importlib.util.find_spec("pptx") is not None
 
 # Import version for user agent
 try:
@@ -69,12 +57,17 @@ def depth_limited_walk(root_dir: Path, max_depth: int):
             return
 
         try:
-            for item in current_dir.iterdir():
-                yield item
-                # Only recurse if we haven't reached max depth and it's a directory
-                if item.is_dir() and not any(part.startswith(".") for part in item.parts):
-                    if current_depth < max_depth:  # Check before recursing
-                        yield from _walk(item, current_depth + 1)
+            # scandir rather than iterdir: DirEntry.is_dir() reuses the file type
+            # reported by the directory listing instead of stat()ing every item
+            with os.scandir(current_dir) as entries:
+                for entry in entries:
+                    item = current_dir / entry.name
+                    yield item
+                    # Only recurse if we haven't reached max depth and it's a non-hidden directory.
+                    # Hidden ancestors are never descended into, so checking the name suffices.
+                    if not entry.name.startswith(".") and entry.is_dir():
+                        if current_depth < max_depth:  # Check before recursing
+                            yield from _walk(item, current_depth + 1)
         except (PermissionError, OSError):
             # Skip directories we can't read
             pass
@@ -82,53 +75,145 @@ def depth_limited_walk(root_dir: Path, max_depth: int):
     yield from _walk(root_dir, 0)
 
 
+def _glob_component_to_regex(component: str) -> str:
+    """Translate a single glob path component into a regex fragment.
+
+    Unlike ``fnmatch.translate``, wildcards never match a path separator, which
+    mirrors how ``PurePath.match`` compares patterns component by component.
+    """
+    i, n = 0, len(component)
+    out = []
+    while i < n:
+        c = component[i]
+        i += 1
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            j = i
+            if j < n and component[j] == "!":
+                j += 1
+            if j < n and component[j] == "]":
+                j += 1
+            while j < n and component[j] != "]":
+                j += 1
+            if j >= n:
+                out.append("\\[")
+            else:
+                chars = component[i:j].replace("\\", "\\\\")
+                i = j + 1
+                if chars.startswith("!"):
+                    chars = "^" + chars[1:]
+                elif chars.startswith("^"):
+                    chars = "\\" + chars
+                out.append(f"[{chars}]")
+        else:
+            out.append(re.escape(c))
+    return "".join(out)
+
+
+def _compile_glob_patterns(patterns: Optional[List[str]]) -> Optional[re.Pattern]:
+    """Compile glob patterns into a single regex with ``PurePath.match`` semantics.
+
+    Patterns match against the trailing components of a relative POSIX path (so
+    ``*.py`` matches ``src/app.py``). Absolute patterns never match a relative path.
+
+    Args:
+        patterns: Glob patterns (e.g., ['*.py', 'src/*_test.go'])
+
+    Returns:
+        Compiled union regex (use ``.search``), or None if there are no patterns
+    """
+    alternatives = []
+    for pattern in patterns or []:
+        if not pattern:
+            continue
+        pure = PurePath(pattern)
+        if pure.anchor:
+            alternatives.append("(?!)")
+            continue
+        body = "/".join(_glob_component_to_regex(part) for part in pure.parts)
+        alternatives.append(f"(?:^|/){body}\\Z")
+    if not alternatives:
+        return None
+    flags = re.IGNORECASE if os.name == "nt" else 0
+    return re.compile("|".join(f"(?:{alt})" for alt in alternatives), flags)
+
+
 # Import config for centralized environment variable access
 from patchpal.config import config  # noqa: E402
 
-# Platform-aware command blocking - minimal list since we have permission system
-# Allow dangerous operations if explicitly enabled via environment variable
-if config.ALLOW_SUDO:
-    # Dangerous operations allowed - no command blocking
-    DANGEROUS_TOKENS = set()
-    DANGEROUS_PATTERNS = []
-elif platform.system() == "Windows":
-    # Windows privilege escalation commands (token-based matching)
-    DANGEROUS_TOKENS = {"runas", "psexec"}  # Run as different user, SysInternals elevated execution
-    # Windows dangerous patterns (substring matching)
-    DANGEROUS_PATTERNS = [
-        "> \\\\.\\",  # Writing to device objects (e.g., \\.\PhysicalDrive0)
-        "| dd",  # Piping to dd
-        "| shred",  # Piping to shred (secure delete)
-        "mkfs.",  # Format filesystem
-        ":(){",  # Fork bomb
-    ]
-else:
-    # Unix/Linux/macOS privilege escalation commands (token-based matching)
-    DANGEROUS_TOKENS = {"sudo", "su", "doas"}  # Privilege escalation (doas is sudo alternative)
-    # Unix/Linux/macOS dangerous patterns (substring matching)
-    DANGEROUS_PATTERNS = [
-        # Block dangerous device writes (but allow safe ones like /dev/null, /dev/zero, /dev/random, /dev/urandom)
-        "> /dev/sd",  # Block disk devices (sda, sdb, etc.)
-        "> /dev/nvme",  # Block NVMe devices
-        "> /dev/hd",  # Block IDE devices
-        "> /dev/vd",  # Block virtual disk devices
-        "> /dev/xvd",  # Block Xen virtual disk devices
-        "> /dev/loop",  # Block loop devices
-        "> /dev/dm-",  # Block device mapper devices
-        "> /dev/md",  # Block RAID devices
-        "> /dev/mem",  # Block memory access
-        "> /dev/kmem",  # Block kernel memory
-        "> /dev/port",  # Block port I/O
-        "rm -rf /",  # Recursive delete from root
-        "| dd",  # Piping to dd (disk destroyer)
-        "| sudo ",  # Piping to sudo (bypass token check)
-        "| shred",  # Piping to shred (secure delete)
-        "mkfs.",  # Format filesystem (mkfs.ext4, mkfs.xfs, etc.)
-        ":(){",  # Fork bomb signature
-    ]
-
-# Backward compatibility alias
-FORBIDDEN = DANGEROUS_TOKENS
+# Platform-aware command blocking - minimal list since we have permission system.
+# Set by reconfigure_from_env() below; shell_tools reads these through the module.
+DANGEROUS_TOKENS = frozenset()
+DANGEROUS_PATTERNS = []
+DANGEROUS_PATTERN_RE = None
+FORBIDDEN = DANGEROUS_TOKENS  # Backward compatibility alias
+
+
+def reconfigure_from_env():
+    """Rebuild the dangerous command blocklist from the current environment.
+
+    Called once at import. Call it again after changing PATCHPAL_ALLOW_SUDO
+    (e.g. in tests) instead of reloading the tools modules.
+    """
+    global DANGEROUS_TOKENS, DANGEROUS_PATTERNS, DANGEROUS_PATTERN_RE, FORBIDDEN
+
+    # Allow dangerous operations if explicitly enabled via environment variable
+    if config.ALLOW_SUDO:
+        # Dangerous operations allowed - no command blocking
+        DANGEROUS_TOKENS = frozenset()
+        DANGEROUS_PATTERNS = []
+    elif platform.system() == "Windows":
+        # Windows privilege escalation commands (token-based matching)
+        # Run as different user, SysInternals elevated execution
+        DANGEROUS_TOKENS = frozenset({"runas", "psexec"})
+        # Windows dangerous patterns (substring matching)
+        DANGEROUS_PATTERNS = [
+            "> \\\\.\\",  # Writing to device objects (e.g., \\.\PhysicalDrive0)
+            "| dd",  # Piping to dd
+            "| shred",  # Piping to shred (secure delete)
+            "mkfs.",  # Format filesystem
+            ":(){",  # Fork bomb
+        ]
+    else:
+        # Unix/Linux/macOS privilege escalation commands (token-based matching)
+        # Privilege escalation (doas is sudo alternative)
+        DANGEROUS_TOKENS = frozenset({"sudo", "su", "doas"})
+        # Unix/Linux/macOS dangerous patterns (substring matching)
+        DANGEROUS_PATTERNS = [
+            # Block dangerous device writes (but allow safe ones like /dev/null, /dev/zero, /dev/random, /dev/urandom)
+            "> /dev/sd",  # Block disk devices (sda, sdb, etc.)
+            "> /dev/nvme",  # Block NVMe devices
+            "> /dev/hd",  # Block IDE devices
+            "> /dev/vd",  # Block virtual disk devices
+            "> /dev/xvd",  # Block Xen virtual disk devices
+            "> /dev/loop",  # Block loop devices
+            "> /dev/dm-",  # Block device mapper devices
+            "> /dev/md",  # Block RAID devices
+            "> /dev/mem",  # Block memory access
+            "> /dev/kmem",  # Block kernel memory
+            "> /dev/port",  # Block port I/O
+            "rm -rf /",  # Recursive delete from root
+            "| dd",  # Piping to dd (disk destroyer)
+            "| sudo ",  # Piping to sudo (bypass token check)
+            "| shred",  # Piping to shred (secure delete)
+            "mkfs.",  # Format filesystem (mkfs.ext4, mkfs.xfs, etc.)
+            ":(){",  # Fork bomb signature
+        ]
+
+    # All dangerous patterns as one precompiled alternation, so a command is scanned
+    # in a single pass instead of once per pattern (None when nothing is blocked)
+    DANGEROUS_PATTERN_RE = (
+        re.compile("|".join(re.escape(pattern) for pattern in DANGEROUS_PATTERNS))
+        if DANGEROUS_PATTERNS
+        else None
+    )
+    FORBIDDEN = DANGEROUS_TOKENS
+
+
+reconfigure_from_env()
 
 # Sensitive file patterns
 SENSITIVE_PATTERNS = {
@@ -408,6 +493,45 @@ class OutputFilter:
     Can save 75% or more on output tokens for verbose commands.
     """
 
+    # Test runners - show only failures
+    TEST_PATTERNS = (
+        "pytest",
+        "npm test",
+        "npm run test",
+        "yarn test",
+        "go test",
+        "cargo test",
+        "mvn test",
+        "gradle test",
+        "ruby -I test",
+        "rspec",
+    )
+
+    # Version control - limit log output
+    VCS_PATTERNS = (
+        "git log",
+        "git reflog",
+    )
+
+    # Package managers - show only important info
+    PKG_PATTERNS = (
+        "npm install",
+        "pip install",
+        "cargo build",
+        "go build",
+    )
+
+    # All filterable command patterns (substring matching) as one precompiled alternation
+    _FILTER_COMMAND_RE = re.compile(
+        "|".join(re.escape(pattern) for pattern in TEST_PATTERNS + VCS_PATTERNS + PKG_PATTERNS)
+    )
+
+    # Line keywords kept by filter_output, matched against the upper-/lower-cased line
+    _TEST_FAILURE_RE = re.compile("FAIL|ERROR|✗|✖")  # Also covers FAILED, FAILURE
+    _TEST_SUMMARY_RE = re.compile("passed|failed|error|summary|total")
+    _BUILD_ISSUE_RE = re.compile("ERROR|WARN|FAIL|SUCCESSFULLY|COMPLETE")
+    _BUILD_SUMMARY_RE = re.compile("installed|built|compiled|finished")
+
     @staticmethod
     def should_filter(cmd: str) -> bool:
         """Check if a command should have its output filtered.
@@ -421,36 +545,16 @@ class OutputFilter:
         if not config.FILTER_OUTPUTS:
             return False
 
-        # Test runners - show only failures
-        test_patterns = [
-            "pytest",
-            "npm test",
-            "npm run test",
-            "yarn test",
-            "go test",
-            "cargo test",
-            "mvn test",
-            "gradle test",
-            "ruby -I test",
-            "rspec",
-        ]
+        return OutputFilter._matches_filter_patterns(cmd)
 
-        # Version control - limit log output
-        vcs_patterns = [
-            "git log",
-            "git reflog",
-        ]
-
-        # Package managers - show only important info
-        pkg_patterns = [
-            "npm install",
-            "pip install",
-            "cargo build",
-            "go build",
-        ]
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _matches_filter_patterns(cmd: str) -> bool:
+        """Check a command against the filterable command patterns.
 
-        all_patterns = test_patterns + vcs_patterns + pkg_patterns
-        return any(pattern in cmd for pattern in all_patterns)
+        Cached because agents tend to run the same commands (e.g., pytest) repeatedly.
+        """
+        return OutputFilter._FILTER_COMMAND_RE.search(cmd) is not None
 
     @staticmethod
     def filter_output(cmd: str, output: str) -> str:
@@ -480,10 +584,7 @@ class OutputFilter:
 
             for line in lines:
                 # Capture failure indicators
-                if any(
-                    keyword in line.upper()
-                    for keyword in ["FAIL", "ERROR", "FAILED", "✗", "✖", "FAILURE"]
-                ):
+                if OutputFilter._TEST_FAILURE_RE.search(line.upper()):
                     in_failure = True
                     failure_context = [line]
                 elif in_failure:
@@ -500,10 +601,7 @@ class OutputFilter:
                         in_failure = False
                         failure_context = []
                 # Always capture summary lines
-                elif any(
-                    keyword in line.lower()
-                    for keyword in ["passed", "failed", "error", "summary", "total"]
-                ):
+                elif OutputFilter._TEST_SUMMARY_RE.search(line.lower()):
                     filtered_lines.append(line)
 
             # Add remaining failure context
@@ -535,16 +633,10 @@ class OutputFilter:
 
             for line in lines:
                 # Keep error/warning lines
-                if any(
-                    keyword in line.upper()
-                    for keyword in ["ERROR", "WARN", "FAIL", "SUCCESSFULLY", "COMPLETE"]
-                ):
+                if OutputFilter._BUILD_ISSUE_RE.search(line.upper()):
                     filtered_lines.append(line)
                 # Keep final summary lines
-                elif any(
-                    keyword in line.lower()
-                    for keyword in ["installed", "built", "compiled", "finished"]
-                ):
+                elif OutputFilter._BUILD_SUMMARY_RE.search(line.lower()):
                     filtered_lines.append(line)
 
             if filtered_lines and len(filtered_lines) < original_lines * 0.3:
@@ -779,14 +871,10 @@ def _is_critical_file(path: Path) -> bool:
     return any(pattern in path_str for pattern in CRITICAL_FILES)
 
 
-def _is_binary_file(path: Path) -> bool:
-    """Check if file is binary."""
-    if not path.exists():
-        return False
-
-    # Known text file extensions (programming languages and common text formats)
-    # Check extension FIRST before trusting MIME types, as MIME detection can be unreliable
-    text_extensions = {
+# Known text file extensions (programming languages and common text formats).
+# Checked FIRST, before trusting MIME types, as MIME detection can be unreliable.
+_TEXT_EXTENSIONS = frozenset(
+    {
         # Programming languages
         ".py",
         ".pyw",
@@ -931,15 +1019,11 @@ def _is_binary_file(path: Path) -> bool:
         ".patch",  # Diffs
         ".log",  # Log files
     }
+)
 
-    # Check extension first (case-insensitive)
-    ext = path.suffix.lower()
-    if ext in text_extensions:
-        return False
-
-    # Check for extensionless known text files (like Makefile, Dockerfile)
-    stem = path.stem.lower()
-    if stem in {
+# Extensionless known text files (like Makefile, Dockerfile), matched on the stem
+_TEXT_FILENAMES = frozenset(
+    {
         "makefile",
         "dockerfile",
         "rakefile",
@@ -948,11 +1032,12 @@ def _is_binary_file(path: Path) -> bool:
         "readme",
         "license",
         "changelog",
-    }:
-        return False
+    }
+)
 
-    # Text-based application MIME types that should be treated as text
-    text_application_mimes = {
+# Text-based application MIME types that should be treated as text
+_TEXT_APPLICATION_MIMES = frozenset(
+    {
         "application/json",
         "application/xml",
         "application/javascript",
@@ -964,12 +1049,28 @@ def _is_binary_file(path: Path) -> bool:
         "application/x-ruby",
         "application/x-php",
     }
+)
+
+
+def _is_binary_file(path: Path) -> bool:
+    """Check if file is binary."""
+    if not path.exists():
+        return False
+
+    # Check extension first (case-insensitive)
+    ext = path.suffix.lower()
+    if ext in _TEXT_EXTENSIONS:
+        return False
+
+    # Check for extensionless known text files (like Makefile, Dockerfile)
+    if path.stem.lower() in _TEXT_FILENAMES:
+        return False
 
     # Check MIME type
     mime_type, _ = mimetypes.guess_type(str(path))
     if mime_type:
         # Allow text/* and whitelisted application/* types
-        if mime_type.startswith("text/") or mime_type in text_application_mimes:
+        if mime_type.startswith("text/") or mime_type in _TEXT_APPLICATION_MIMES:
             return False
         # For unknown MIME types, fall through to content check
         # Don't immediately reject as binary based on MIME alone
@@ -1232,6 +1333,8 @@ def extract_text_from_pdf(content: bytes, source: str = "document") -> str:
         )
 
     try:
+        import pymupdf
+
         pdf_document = pymupdf.open(stream=content, filetype="pdf")
         text_parts = []
         for page_num in range(pdf_document.page_count):
@@ -1265,6 +1368,8 @@ def extract_text_from_docx(content: bytes, source: str = "document") -> str:
     try:
         import io
 
+        import docx
+
         doc = docx.Document(io.BytesIO(content))
         text_parts = []
         for paragraph in doc.paragraphs:
@@ -1296,6 +1401,8 @@ def extract_text_from_pptx(content: bytes, source: str = "document") -> str:
     try:
         import io
 
+        import pptx
+
         prs = pptx.Presentation(io.BytesIO(content))
         text_parts = []
         for slide_num, slide in enumerate(prs.slides, 1):
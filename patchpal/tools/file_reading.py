@@ -1,10 +1,12 @@
 """File operation tools (read, get info)."""
 
 import mimetypes
+from itertools import islice
 from typing import Optional
 
 from patchpal.config import config
 from patchpal.tools.common import (
+    _TEXT_EXTENSIONS,
     _check_path,
     _is_binary_file,
     _operation_limiter,
@@ -39,8 +41,11 @@ def read_file(path: str) -> str:
 
     # Get file size and MIME type
     size = p.stat().st_size
-    mime_type, _ = mimetypes.guess_type(str(p))
     ext = p.suffix.lower()
+    # Known text extensions (source code, config, markup) need no MIME lookup or binary
+    # sniffing; every type check below also matches on the extension alone
+    is_known_text = ext in _TEXT_EXTENSIONS
+    mime_type = None if is_known_text else mimetypes.guess_type(str(p))[0]
 
     # Image formats - return as base64 data URL for vision models
     image_extensions = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".webp", ".svg", ".ico"}
@@ -72,8 +77,9 @@ def read_file(path: str) -> str:
         import base64
 
         try:
-            content_bytes = p.read_bytes()
-            b64_data = base64.b64encode(content_bytes).decode("utf-8")
+            # Don't keep the raw bytes alive: they can be freed as soon as they're encoded,
+            # before the decoded string and the IMAGE_DATA result are built
+            b64_data = base64.b64encode(p.read_bytes()).decode("ascii")
         except Exception as e:
             raise ValueError(
                 f"Failed to read or encode image file '{path}': {e}\n"
@@ -192,7 +198,7 @@ def read_file(path: str) -> str:
         )
 
     # Check if binary (for non-document files)
-    if _is_binary_file(p):
+    if not is_known_text and _is_binary_file(p):
         raise ValueError(
             f"Cannot read binary file: {path}\nType: {mime_type or 'unknown'}\n"
             f"Supported document formats: PDF, DOCX, PPTX"
@@ -252,25 +258,24 @@ def read_lines(path: str, start_line: int, end_line: Optional[int] = None) -> st
             f"Cannot read binary file: {path}\nType: {mimetypes.guess_type(str(p))[0] or 'unknown'}"
         )
 
-    # Read file and extract lines
+    # Read only up to end_line; skipped lines are counted, never kept
     try:
         with open(p, "r", encoding="utf-8", errors="surrogateescape", newline=None) as f:
-            lines = f.readlines()
+            lines_before = sum(1 for _ in islice(f, start_line - 1))
+            requested_lines = list(islice(f, end_line - start_line + 1))
     except Exception as e:
         raise ValueError(f"Failed to read file: {e}")
 
-    total_lines = len(lines)
+    # The file length is only known (and only needed) when it ends before end_line
+    total_lines = lines_before + len(requested_lines)
 
     # Check if line numbers are within range
-    if start_line > total_lines:
+    if not requested_lines:
         raise ValueError(f"start_line {start_line} exceeds file length ({total_lines} lines)")
 
     # Adjust end_line if it exceeds file length
     actual_end_line = min(end_line, total_lines)
 
-    # Extract requested lines (convert to 0-indexed)
-    requested_lines = lines[start_line - 1 : actual_end_line]
-
     # Format output with line numbers
     result = []
     for i, line in enumerate(requested_lines, start=start_line):
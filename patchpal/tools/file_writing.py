@@ -1,6 +1,9 @@
 """File editing tools (write_file, edit_file)."""
 
 import difflib
+import os
+import secrets
+import stat
 from pathlib import Path
 from typing import Optional
 
@@ -47,6 +50,69 @@ def _get_outside_repo_warning(path: Path) -> str:
 # exact character-by-character matching
 
 
+def _write_text_in_place(path: Path, content: str) -> None:
+    """Truncate and rewrite path, keeping its inode, owner, and hard links."""
+    with open(path, "w", encoding="utf-8", errors="surrogateescape", newline="\n") as f:
+        f.write(content)
+
+
+def _copy_owner_and_mode(tmp_path: Path, st: os.stat_result) -> bool:
+    """Give tmp_path the owner, group, and mode from st.
+
+    Returns:
+        False if the owner or group cannot be carried over
+    """
+    tmp_st = os.stat(tmp_path)
+    if (tmp_st.st_uid, tmp_st.st_gid) != (st.st_uid, st.st_gid):
+        try:
+            os.chown(tmp_path, st.st_uid, st.st_gid)
+        except (OSError, AttributeError):  # AttributeError: no os.chown on Windows
+            return False
+    # After chown, which clears setuid/setgid bits
+    os.chmod(tmp_path, stat.S_IMODE(st.st_mode))
+    return True
+
+
+def _atomic_write_text(path: Path, content: str) -> None:
+    """Write content via a temp file and rename so a failed write never truncates path.
+
+    Falls back to rewriting the file in place when replacing it would change more
+    than its content: hard-linked files, files whose owner can't be kept, and
+    directories the temp file can't be created in.
+    """
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        st = None
+
+    if st is None or st.st_nlink == 1:
+        tmp_path = path.with_name(f".{path.name}.{secrets.token_hex(4)}.tmp")
+        try:
+            # Mode 0o666 under the caller's umask, as open(path, "w") would create it
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        except OSError:
+            fd = None  # e.g. the file is writable but its directory is not
+        if fd is not None:
+            try:
+                with os.fdopen(
+                    fd, "w", encoding="utf-8", errors="surrogateescape", newline="\n"
+                ) as f:
+                    replace = st is None or _copy_owner_and_mode(tmp_path, st)
+                    if replace:
+                        f.write(content)
+                        f.flush()
+                        os.fsync(f.fileno())
+                if replace:
+                    os.replace(tmp_path, path)
+                    return
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            os.unlink(tmp_path)
+
+    _write_text_in_place(path, content)
+
+
 def _try_simple_match(content: str, old_string: str) -> Optional[str]:
     """Try exact string match."""
     if old_string in content:
@@ -262,8 +328,7 @@ def write_file(path: str, content: str) -> str:
 
     # Write the new content
     p.parent.mkdir(parents=True, exist_ok=True)
-    with open(p, "w", encoding="utf-8", errors="surrogateescape", newline="\n") as f:
-        f.write(content)
+    _atomic_write_text(p, content)
 
     backup_msg = f"\n[Backup saved: {backup_path}]" if backup_path else ""
 
@@ -317,8 +382,9 @@ def edit_file(path: str, old_string: str, new_string: str) -> str:
 
     # Try to find a match using multiple strategies
     matched_string = _find_match_with_strategies(content, old_string)
+    match_start = content.find(matched_string) if matched_string else -1
 
-    if not matched_string:
+    if match_start < 0:
         # No match found with any strategy
         raise ValueError(
             f"String not found in {path}.\n\n"
@@ -326,9 +392,10 @@ def edit_file(path: str, old_string: str, new_string: str) -> str:
             f"💡 Tip: Use read_lines() to see exact content."
         )
 
-    # Count occurrences of the matched string
-    count = content.count(matched_string)
-    if count > 1:
+    # A second non-overlapping hit after the first match means it is ambiguous
+    match_end = match_start + len(matched_string)
+    if content.find(matched_string, match_end) != -1:
+        count = content.count(matched_string)
         # Show WHERE the matches are
         positions = []
         start = 0
@@ -414,11 +481,10 @@ def edit_file(path: str, old_string: str, new_string: str) -> str:
     # Backup if enabled
     backup_path = _backup_file(p)
 
-    new_content = content.replace(matched_string, adjusted_new_string)
+    new_content = content[:match_start] + adjusted_new_string + content[match_end:]
 
     # Write the new content
-    with open(p, "w", encoding="utf-8", errors="surrogateescape", newline="\n") as f:
-        f.write(new_content)
+    _atomic_write_text(p, new_content)
 
     # Generate diff for the specific change (use adjusted_new_string for accurate diff)
     old_lines = matched_string.split("\n")
@@ -6,11 +6,14 @@ without requiring run_shell access.
 """
 
 import os
+import re
+import stat
 from pathlib import Path
-from typing import Optional
+from typing import FrozenSet, Optional, Tuple
 
 from patchpal.tools.common import (
     REPO_ROOT,
+    _compile_glob_patterns,
     _operation_limiter,
     depth_limited_walk,
     require_permission_for_read,
@@ -89,8 +92,11 @@ def find(pattern: str = "**/*", path: Optional[str] = None, max_depth: Optional[
     # Collect candidate files
     if max_depth is not None:
         # Depth-limited: walk tree and filter by pattern
-        all_files = [p for p in depth_limited_walk(search_dir, max_depth) if p.is_file()]
-        matches = [f for f in all_files if _matches_glob_pattern(f, search_dir, pattern)]
+        matches = [
+            p
+            for p in depth_limited_walk(search_dir, max_depth)
+            if _matches_glob_pattern(p, search_dir, pattern)
+        ]
     else:
         # Check if pattern requires recursive search
         if "**" in pattern:
@@ -105,25 +111,20 @@ def find(pattern: str = "**/*", path: Optional[str] = None, max_depth: Optional[
                 # Simple filename pattern - search recursively
                 matches = list(search_dir.glob(f"**/{pattern}"))
 
-        # Filter to only files
-        matches = [p for p in matches if p.is_file()]
-
-    # Load gitignore patterns if .gitignore exists
-    gitignore_patterns = _load_gitignore_patterns(REPO_ROOT)
+    # Load gitignore patterns if .gitignore exists, compiled once for all matches
+    gitignore = _compile_gitignore_patterns(_load_gitignore_patterns(REPO_ROOT))
 
     # Filter out gitignored files
-    filtered_matches = []
-    for match in matches:
-        if not _is_gitignored(match, REPO_ROOT, gitignore_patterns):
-            filtered_matches.append(match)
-
-    matches = filtered_matches
+    matches = [match for match in matches if not _is_gitignored(match, REPO_ROOT, gitignore)]
 
-    # Collect files with modification times
+    # Collect files with modification times (one stat per match also filters out directories)
     files_with_mtime = []
     for file_path in matches:
         try:
-            mtime = file_path.stat().st_mtime
+            st = file_path.stat()
+            if not stat.S_ISREG(st.st_mode):
+                continue
+            mtime = st.st_mtime
             # Relativize path
             try:
                 rel_path = file_path.relative_to(REPO_ROOT)
@@ -182,9 +183,43 @@ def _load_gitignore_patterns(repo_root: Path) -> list:
     return patterns
 
 
-def _is_gitignored(file_path: Path, repo_root: Path, patterns: list) -> bool:
-    """Check if a file matches any gitignore pattern."""
-    if not patterns:
+def _compile_gitignore_patterns(
+    patterns: list,
+) -> Tuple[Optional[re.Pattern], FrozenSet[str], Tuple[str, ...]]:
+    """Compile gitignore patterns once so each file is checked without re-parsing them.
+
+    Negation patterns are skipped (we're doing simple matching). Patterns with ``*`` are
+    glob-matched (``**`` treated as ``*``); others must equal the whole relative path,
+    end it after a ``/``, or equal one of its components.
+
+    Returns:
+        (glob_regex or None, exact names, "/"-prefixed suffixes of the exact names)
+    """
+    glob_patterns = []
+    exact = set()
+    for pattern in patterns:
+        if pattern.startswith("!"):
+            continue
+        pattern = pattern.rstrip("/").replace("**", "*")
+        if "*" in pattern:
+            glob_patterns.append(pattern)
+        else:
+            exact.add(pattern)
+    return (
+        _compile_glob_patterns(glob_patterns),
+        frozenset(exact),
+        tuple(f"/{pattern}" for pattern in exact),
+    )
+
+
+def _is_gitignored(
+    file_path: Path,
+    repo_root: Path,
+    compiled: Tuple[Optional[re.Pattern], FrozenSet[str], Tuple[str, ...]],
+) -> bool:
+    """Check if a file matches any gitignore pattern compiled by _compile_gitignore_patterns."""
+    glob_re, exact, exact_suffixes = compiled
+    if glob_re is None and not exact:
         return False
 
     try:
@@ -193,46 +228,17 @@ def _is_gitignored(file_path: Path, repo_root: Path, patterns: list) -> bool:
         # File is outside repo root
         return False
 
-    rel_path_str = str(rel_path)
+    # Match against full path or any path component
     parts = rel_path.parts
-
-    for pattern in patterns:
-        # Skip negation patterns (we're doing simple matching)
-        if pattern.startswith("!"):
-            continue
-
-        # Remove trailing slash
-        pattern = pattern.rstrip("/")
-
-        # Check for directory-only patterns
-        if pattern.endswith("/"):
-            pattern = pattern.rstrip("/")
-            # Check if any parent directory matches
-            for part in parts[:-1]:  # Exclude filename
-                if _match_pattern(part, pattern):
-                    return True
-        else:
-            # Match against full path or any path component
-            if _match_pattern(rel_path_str, pattern):
-                return True
-            # Also check if pattern matches any directory name
-            for part in parts:
-                if _match_pattern(part, pattern):
-                    return True
+    if exact:
+        rel_path_str = str(rel_path)
+        if rel_path_str in exact or rel_path_str.endswith(exact_suffixes):
+            return True
+        if not exact.isdisjoint(parts):
+            return True
+    if glob_re is not None:
+        if glob_re.search(rel_path.as_posix()):
+            return True
+        return any(glob_re.search(part) for part in parts)
 
     return False
-
-
-def _match_pattern(text: str, pattern: str) -> bool:
-    """Simple glob pattern matching."""
-    # Convert glob pattern to something we can match
-    if "**" in pattern:
-        # Recursive pattern
-        pattern = pattern.replace("**", "*")
-
-    if "*" in pattern:
-        # Use Path.match for glob patterns
-        return Path(text).match(pattern)
-    else:
-        # Exact match
-        return text == pattern or text.endswith(f"/{pattern}")
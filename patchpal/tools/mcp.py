@@ -73,7 +73,10 @@ except ImportError:
     TextContent = Any  # type: ignore
 
 
-# Module-level cache for MCP server connection parameters
+# Module-level cache for MCP server connection parameters.
+# Rebuilt by load_mcp_tools() from the (mtime-cached) parsed config; holds the
+# env-expanded config of each enabled server by reference, so resource and
+# prompt calls never re-read or re-parse the config files.
 _server_configs: Dict[str, Dict[str, Any]] = {}
 
 
@@ -558,6 +561,49 @@ def _format_tool_result(result) -> str:
     return "\n".join(output_parts) if output_parts else "Tool executed successfully."
 
 
+def _iter_prompt_messages(result):
+    """Yield ``[role]: text`` strings for each content item in a prompt result.
+
+    Args:
+        result: MCP get_prompt result
+
+    Yields:
+        Formatted message strings
+    """
+    if not hasattr(result, "messages"):
+        # Fallback if structure is different
+        yield str(result)
+        return
+
+    for message in result.messages:
+        # Build the role prefix once per message rather than per content item
+        prefix = f"[{getattr(message, 'role', 'unknown')}]: "
+        content = message.content
+
+        # content is typically a list of content items
+        items = content if isinstance(content, list) else (content,)
+        for item in items:
+            if isinstance(item, TextContent):
+                yield prefix + item.text
+            elif hasattr(item, "text"):
+                yield prefix + item.text
+            else:
+                yield prefix + str(item)
+
+
+def _format_prompt_result(result) -> str:
+    """Format MCP prompt messages into a readable string.
+
+    Args:
+        result: MCP get_prompt result
+
+    Returns:
+        Formatted string output
+    """
+    output = "\n\n".join(_iter_prompt_messages(result))
+    return output or "Prompt executed successfully."
+
+
 def list_mcp_resources() -> List[Dict[str, Any]]:
     """List all available resources from connected MCP servers.
 
@@ -947,36 +993,7 @@ async def _get_local_server_prompt(
             await session.initialize()
             result = await session.get_prompt(prompt_name, arguments=arguments)
 
-            # Format the prompt messages into a readable string
-            output_parts = []
-            if hasattr(result, "messages"):
-                for message in result.messages:
-                    role = getattr(message, "role", "unknown")
-                    content = message.content
-
-                    # content is typically a list of content items
-                    if isinstance(content, list):
-                        for item in content:
-                            if isinstance(item, TextContent):
-                                output_parts.append(f"[{role}]: {item.text}")
-                            elif hasattr(item, "text"):
-                                output_parts.append(f"[{role}]: {item.text}")
-                            else:
-                                output_parts.append(f"[{role}]: {str(item)}")
-                    elif isinstance(content, TextContent):
-                        output_parts.append(f"[{role}]: {content.text}")
-                    elif hasattr(content, "text"):
-                        output_parts.append(f"[{role}]: {content.text}")
-                    else:
-                        output_parts.append(f"[{role}]: {str(content)}")
-            else:
-                # Fallback if structure is different
-                output_parts.append(str(result))
-
-    # Give subprocess time to clean up properly
-    await asyncio.sleep(0.1)
-
-    return "\n\n".join(output_parts) if output_parts else "Prompt executed successfully."
+    return _format_prompt_result(result)
 
 
 async def _get_remote_server_prompt(
@@ -996,35 +1013,7 @@ async def _get_remote_server_prompt(
                 await session.initialize()
                 result = await session.get_prompt(prompt_name, arguments=arguments)
 
-                # Format the prompt messages into a readable string
-                output_parts = []
-                if hasattr(result, "messages"):
-                    for message in result.messages:
-                        role = getattr(message, "role", "unknown")
-                        content = message.content
-
-                        # content is typically a list of content items
-                        if isinstance(content, list):
-                            for item in content:
-                                if isinstance(item, TextContent):
-                                    output_parts.append(f"[{role}]: {item.text}")
-                                elif hasattr(item, "text"):
-                                    output_parts.append(f"[{role}]: {item.text}")
-                                else:
-                                    output_parts.append(f"[{role}]: {str(item)}")
-                        elif isinstance(content, TextContent):
-                            output_parts.append(f"[{role}]: {content.text}")
-                        elif hasattr(content, "text"):
-                            output_parts.append(f"[{role}]: {content.text}")
-                        else:
-                            output_parts.append(f"[{role}]: {str(content)}")
-                else:
-                    # Fallback if structure is different
-                    output_parts.append(str(result))
-
-                return (
-                    "\n\n".join(output_parts) if output_parts else "Prompt executed successfully."
-                )
+                return _format_prompt_result(result)
     except Exception as e:
         last_error = e
         # Continue to SSE fallback
@@ -1036,35 +1025,7 @@ async def _get_remote_server_prompt(
                 await session.initialize()
                 result = await session.get_prompt(prompt_name, arguments=arguments)
 
-                # Format the prompt messages into a readable string
-                output_parts = []
-                if hasattr(result, "messages"):
-                    for message in result.messages:
-                        role = getattr(message, "role", "unknown")
-                        content = message.content
-
-                        # content is typically a list of content items
-                        if isinstance(content, list):
-                            for item in content:
-                                if isinstance(item, TextContent):
-                                    output_parts.append(f"[{role}]: {item.text}")
-                                elif hasattr(item, "text"):
-                                    output_parts.append(f"[{role}]: {item.text}")
-                                else:
-                                    output_parts.append(f"[{role}]: {str(item)}")
-                        elif isinstance(content, TextContent):
-                            output_parts.append(f"[{role}]: {content.text}")
-                        elif hasattr(content, "text"):
-                            output_parts.append(f"[{role}]: {content.text}")
-                        else:
-                            output_parts.append(f"[{role}]: {str(content)}")
-                else:
-                    # Fallback if structure is different
-                    output_parts.append(str(result))
-
-                return (
-                    "\n\n".join(output_parts) if output_parts else "Prompt executed successfully."
-                )
+                return _format_prompt_result(result)
     except Exception as sse_error:
         # Both transports failed
         if last_error:
@@ -1072,6 +1033,47 @@ async def _get_remote_server_prompt(
         raise sse_error
 
 
+# Parsed config files keyed by absolute path -> ((mtime_ns, size), parsed JSON)
+_config_file_cache: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+
+
+def _read_config_file(path: Path) -> Optional[Dict[str, Any]]:
+    """Read and parse a JSON config file, reusing the parsed result if unchanged.
+
+    The parsed dict is cached by the file's mtime and size, so repeated MCP
+    operations in the same process do no re-parsing. Callers must treat the
+    returned dict as read-only.
+
+    Args:
+        path: Path to the JSON config file
+
+    Returns:
+        Parsed config dict, or None if the file does not exist
+
+    Raises:
+        json.JSONDecodeError: If the file is not valid JSON
+    """
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+
+    # Absolute key: the project config path is relative to the current directory
+    key = os.path.abspath(path)
+    signature = (st.st_mtime_ns, st.st_size)
+    cached = _config_file_cache.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    try:
+        text = path.read_bytes().decode("utf-8", errors="surrogateescape")
+    except OSError:
+        return None
+    data = json.loads(text)
+    _config_file_cache[key] = (signature, data)
+    return data
+
+
 def _load_mcp_config(config_path: Optional[Path] = None) -> Dict[str, Any]:
     """Load MCP configuration from file(s).
 
@@ -1096,57 +1098,60 @@ def _load_mcp_config(config_path: Optional[Path] = None) -> Dict[str, Any]:
     """
     if config_path is not None:
         # Explicit path provided - load only that file
-        if config_path.exists():
-            try:
-                with open(
-                    config_path, "r", encoding="utf-8", errors="surrogateescape", newline=None
-                ) as f:
-                    return json.load(f)
-            except json.JSONDecodeError as e:
-                print(f"Warning: Failed to parse MCP config at {config_path}: {e}")
-                return {}
-        return {}
+        try:
+            return _read_config_file(config_path) or {}
+        except json.JSONDecodeError as e:
+            print(f"Warning: Failed to parse MCP config at {config_path}: {e}")
+            return {}
 
     # Load and merge from both standard locations
     global_config_path = Path.home() / ".patchpal" / "mcp-config.json"
     project_config_path = Path(".patchpal") / "mcp-config.json"
 
-    merged_config: Dict[str, Any] = {}
-
     # Load global config first
-    if global_config_path.exists():
-        try:
-            with open(
-                global_config_path, "r", encoding="utf-8", errors="surrogateescape", newline=None
-            ) as f:
-                global_config = json.load(f)
-            merged_config = global_config
-        except json.JSONDecodeError as e:
-            print(f"Warning: Failed to parse global MCP config at {global_config_path}: {e}")
+    try:
+        global_config = _read_config_file(global_config_path)
+    except json.JSONDecodeError as e:
+        print(f"Warning: Failed to parse global MCP config at {global_config_path}: {e}")
+        global_config = None
 
-    # Load and merge project config (overrides global)
-    if project_config_path.exists():
-        try:
-            with open(
-                project_config_path, "r", encoding="utf-8", errors="surrogateescape", newline=None
-            ) as f:
-                project_config = json.load(f)
+    # Load project config (overrides global)
+    try:
+        project_config = _read_config_file(project_config_path)
+    except json.JSONDecodeError as e:
+        print(f"Warning: Failed to parse project MCP config at {project_config_path}: {e}")
+        project_config = None
 
-            # Merge MCP server configurations
-            if "mcp" in project_config:
-                if "mcp" not in merged_config:
-                    merged_config["mcp"] = {}
+    return _merge_mcp_configs(global_config, project_config)
 
-                # Project servers override global servers by name
-                merged_config["mcp"].update(project_config["mcp"])
 
-            # Merge other top-level config keys (for future extensibility)
-            for key, value in project_config.items():
-                if key != "mcp":
-                    merged_config[key] = value
+def _merge_mcp_configs(
+    global_config: Optional[Dict[str, Any]], project_config: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Merge a project MCP config over a global one.
 
-        except json.JSONDecodeError as e:
-            print(f"Warning: Failed to parse project MCP config at {project_config_path}: {e}")
+    Neither input is mutated, so cached dicts from _read_config_file can be
+    passed in directly.
+
+    Args:
+        global_config: Parsed global config, or None if absent/invalid
+        project_config: Parsed project config, or None if absent/invalid
+
+    Returns:
+        Merged configuration dict (empty if both are None)
+    """
+    merged_config: Dict[str, Any] = dict(global_config) if global_config is not None else {}
+
+    if project_config is not None:
+        # Merge MCP server configurations
+        if "mcp" in project_config:
+            # Project servers override global servers by name
+            merged_config["mcp"] = {**merged_config.get("mcp", {}), **project_config["mcp"]}
+
+        # Merge other top-level config keys (for future extensibility)
+        for key, value in project_config.items():
+            if key != "mcp":
+                merged_config[key] = value
 
     return merged_config
 
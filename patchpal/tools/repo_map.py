@@ -7,53 +7,92 @@ than reading individual files.
 Inspired by aider's repomap feature, optimized for PatchPal's architecture.
 """
 
+import json
+import os
+import stat
+import tempfile
 import time
+from collections import OrderedDict
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import AbstractSet, Dict, Iterator, List, Optional, Tuple
 
-from patchpal.tools.code_analysis import LANGUAGE_MAP, code_structure
-from patchpal.tools.common import REPO_ROOT, _operation_limiter, depth_limited_walk
+from patchpal.config import config
+from patchpal.tools.code_analysis import SUPPORTED_EXTENSIONS, _code_structure_lines
+from patchpal.tools.common import (
+    PATCHPAL_DIR,
+    REPO_ROOT,
+    _compile_glob_patterns,
+    _operation_limiter,
+)
+
+# Bump when the cached structure format changes so stale caches are discarded
+REPO_MAP_CACHE_VERSION = 1
 
 
 class RepoMapCache:
-    """Simple in-memory cache for repository map data with mtime tracking."""
+    """Cache for repository map data with mtime tracking.
+
+    Entries can be persisted to disk so a new process only re-parses files that
+    changed since the last scan.
+    """
 
-    def __init__(self):
-        self.cache: Dict[str, Tuple[float, str]] = {}  # path -> (mtime, structure)
+    def __init__(self, cache_file: Optional[Path] = None, max_entries: int = 5000):
+        """Initialize the cache.
+
+        Args:
+            cache_file: Optional file used to persist entries across processes
+            max_entries: Maximum number of files to keep; least recently used
+                entries are evicted beyond this (default: 5000). get_repo_map
+                raises it to the number of files in the current scan, so a
+                full scan never evicts its own entries.
+        """
+        # path -> (mtime, structure), ordered from least to most recently used
+        self.cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.max_entries = max_entries
         self.last_full_scan: float = 0  # Track when we last scanned the repo
+        self.cache_file = cache_file
+        self.loaded = cache_file is None  # Nothing to load without a cache file
+        self.dirty = False  # Entries changed since the last load/save
 
-    def get(self, path: Path) -> Optional[str]:
+    def get(self, path: str, mtime: float) -> Optional[str]:
         """Get cached structure if file hasn't changed.
 
         Args:
-            path: Path to the file
+            path: Path to the file (used directly as the cache key)
+            mtime: Current modification time of the file
 
         Returns:
             Cached structure string if valid, None otherwise
         """
-        try:
-            mtime = path.stat().st_mtime
-            cache_key = str(path)
-            if cache_key in self.cache:
-                cached_mtime, structure = self.cache[cache_key]
-                if cached_mtime == mtime:
-                    return structure
-        except Exception:
-            pass
+        entry = self.cache.get(path)
+        if entry is not None and entry[0] == mtime:
+            self.cache.move_to_end(path)
+            return entry[1]
         return None
 
-    def set(self, path: Path, structure: str):
+    def set(self, path: str, mtime: float, structure: str):
         """Cache structure with mtime.
 
         Args:
-            path: Path to the file
+            path: Path to the file (used directly as the cache key)
+            mtime: Modification time of the file when the structure was generated
             structure: Formatted structure string to cache
         """
-        try:
-            mtime = path.stat().st_mtime
-            self.cache[str(path)] = (mtime, structure)
-        except Exception:
-            pass
+        self.cache[path] = (mtime, structure)
+        self.cache.move_to_end(path)
+        if len(self.cache) > self.max_entries:
+            self.cache.popitem(last=False)
+        self.dirty = True
+
+    def ensure_capacity(self, min_entries: int):
+        """Raise max_entries so at least min_entries files fit without eviction.
+
+        Args:
+            min_entries: Number of entries that must fit (e.g., files in a scan)
+        """
+        if min_entries > self.max_entries:
+            self.max_entries = min_entries
 
     def should_rescan(self, max_age_seconds: float = 60) -> bool:
         """Check if enough time has passed to warrant a full rescan.
@@ -70,9 +109,152 @@ class RepoMapCache:
         """Mark that we just completed a full repository scan."""
         self.last_full_scan = time.time()
 
+    def load(self):
+        """Load persisted entries from the cache file, if present and compatible.
 
-# Global cache instance
-_REPO_MAP_CACHE = RepoMapCache()
+        Entries are still validated against each file's mtime on lookup, so a
+        stale entry is simply re-parsed.
+        """
+        self.loaded = True
+        if self.cache_file is None:
+            return
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("version") != REPO_MAP_CACHE_VERSION:
+            return
+        entries = data.get("entries")
+        if not isinstance(entries, dict):
+            return
+        # Persisted entries (saved in LRU order) are older than anything set this session
+        merged: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        for path, entry in entries.items():
+            if not (
+                isinstance(entry, (list, tuple))
+                and len(entry) == 2
+                and isinstance(entry[0], (int, float))
+                and isinstance(entry[1], str)
+            ):
+                return  # Malformed file: discard it, as with an incompatible version
+            if path not in self.cache:
+                merged[path] = (entry[0], entry[1])
+        merged.update(self.cache)
+        self.cache = merged
+        while len(self.cache) > self.max_entries:
+            self.cache.popitem(last=False)
+
+    def save(self):
+        """Persist entries to the cache file atomically if anything changed."""
+        if self.cache_file is None or not self.dirty:
+            return
+        data = {"version": REPO_MAP_CACHE_VERSION, "entries": self.cache}
+        try:
+            fd, tmp_path = tempfile.mkstemp(
+                dir=self.cache_file.parent, prefix=".repo_map_cache.", suffix=".tmp"
+            )
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f, separators=(",", ":"))
+                os.replace(tmp_path, self.cache_file)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self.dirty = False
+        except OSError:
+            pass  # Persisting is an optimization; never fail the repo map over it
+
+
+# Persisted cache location (alongside permissions.json and audit.log)
+REPO_MAP_CACHE_FILE = PATCHPAL_DIR / "repo_map_cache.json"
+
+# Global cache instance (entries are loaded lazily on first use)
+_REPO_MAP_CACHE = RepoMapCache(REPO_MAP_CACHE_FILE)
+
+
+# Directories that never contain code worth mapping; pruned before descent
+_EXCLUDED_DIRS = frozenset({"node_modules", "__pycache__"})
+
+
+def _walk_code_files(
+    root: Path, supported_extensions: AbstractSet[str], max_depth: Optional[int] = None
+) -> Iterator[Tuple[str, str, float]]:
+    """Walk the repository yielding code files with their modification times.
+
+    Hidden and excluded directories are pruned at the directory level, so their
+    contents are never enumerated. Symlinked directories are followed; each
+    directory is visited at most once (by device and inode), so link cycles
+    terminate and a linked-in directory is not listed twice.
+
+    Args:
+        root: Root directory to start traversal
+        supported_extensions: File extensions (without dot) to yield
+        max_depth: Maximum depth to traverse (None for unlimited, 0 = only root level)
+
+    Yields:
+        (path, rel_path, mtime) tuples of strings/floats for regular files with a
+        supported extension, where rel_path is relative to root
+    """
+    root_str = os.fspath(root)
+    prefix_len = len(os.path.join(root_str, ""))
+    try:
+        root_st = os.stat(root_str)
+    except OSError:
+        return
+    visited = {(root_st.st_dev, root_st.st_ino)}
+    stack = [(root_str, 0)]
+    while stack:
+        current_dir, depth = stack.pop()
+        try:
+            with os.scandir(current_dir) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if name.startswith("."):
+                        continue
+                    try:
+                        if entry.is_dir():
+                            if name not in _EXCLUDED_DIRS and (
+                                max_depth is None or depth < max_depth
+                            ):
+                                dir_st = entry.stat()
+                                key = (dir_st.st_dev, dir_st.st_ino)
+                                if key not in visited:
+                                    visited.add(key)
+                                    stack.append((entry.path, depth + 1))
+                            continue
+                        _, dot, ext = name.rpartition(".")
+                        if not dot or ext not in supported_extensions:
+                            continue
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    if stat.S_ISREG(st.st_mode):
+                        entry_path = entry.path
+                        yield entry_path, entry_path[prefix_len:], st.st_mtime
+        except OSError:
+            # Skip directories we can't read
+            continue
+
+
+def _summarize_structure(rel_path: str) -> Optional[str]:
+    """Generate the compact per-file structure shown in the repo map.
+
+    Args:
+        rel_path: File path relative to the repository root
+
+    Returns:
+        Up to 30 symbol lines, or None if the file could not be analyzed
+    """
+    try:
+        lines = _code_structure_lines(rel_path, max_symbols=20)
+    except Exception:
+        return None
+    if lines is None:
+        return None
+
+    # Limit to 30 lines per file to keep it compact
+    return "\n".join(islice(lines, 30))
 
 
 def get_repo_map(
@@ -123,82 +305,50 @@ def get_repo_map(
     """
     _operation_limiter.check_limit(f"get_repo_map(max_files={max_files})")
 
-    # Get supported file extensions
-    supported_extensions = set(LANGUAGE_MAP.keys())
-
     # Convert patterns to sets for faster lookup
     focus_set = set(focus_files or [])
 
+    # Compile include/exclude globs once instead of re-parsing them per file
+    include_re = _compile_glob_patterns(include_patterns)
+    exclude_re = _compile_glob_patterns(exclude_patterns)
+
+    # Pick up structures persisted by previous sessions
+    if not _REPO_MAP_CACHE.loaded:
+        _REPO_MAP_CACHE.load()
+
     # Collect all code files
     file_structures: Dict[str, str] = {}
     skipped_count = 0
 
-    # Use depth-limited traversal if max_depth is specified
-    if max_depth is not None:
-        paths_to_check = depth_limited_walk(REPO_ROOT, max_depth)
-    else:
-        paths_to_check = REPO_ROOT.rglob("*")
-
-    for path in paths_to_check:
-        # Skip directories, hidden files, and non-code files
-        if not path.is_file():
-            continue
-        if any(part.startswith(".") for part in path.parts):
-            continue
-
-        ext = path.suffix.lstrip(".")
-        if ext not in supported_extensions:
-            continue
-
-        # Get relative path
-        try:
-            rel_path = path.relative_to(REPO_ROOT)
-        except ValueError:
-            continue
+    # Walk first so the cache can hold the whole scan; otherwise a repo with more
+    # files than the bound would evict its own entries and re-parse every call
+    code_files = list(_walk_code_files(REPO_ROOT, SUPPORTED_EXTENSIONS, max_depth))
+    _REPO_MAP_CACHE.ensure_capacity(len(code_files))
 
+    for path, rel_path, mtime in code_files:
         # Apply include/exclude patterns
-        if include_patterns:
-            if not any(rel_path.match(pattern) for pattern in include_patterns):
+        if include_re or exclude_re:
+            rel_posix = rel_path if os.sep == "/" else rel_path.replace(os.sep, "/")
+            if include_re and not include_re.search(rel_posix):
                 skipped_count += 1
                 continue
-        if exclude_patterns:
-            if any(rel_path.match(pattern) for pattern in exclude_patterns):
+            if exclude_re and exclude_re.search(rel_posix):
                 skipped_count += 1
                 continue
 
-        # Try to get from cache
-        structure = _REPO_MAP_CACHE.get(path)
-
+        # Try to get from cache, generating the structure on a miss
+        structure = _REPO_MAP_CACHE.get(path, mtime)
         if structure is None:
-            # Generate structure
-            # Pass _internal_call=True so code_structure doesn't count as an operation
-            # This prevents repo_map from using thousands of operations in large repos
-            try:
-                structure = code_structure(str(rel_path), max_symbols=20, _internal_call=True)
-                if structure and not structure.startswith("❌"):
-                    # Extract just the essential parts (remove hints and verbose info)
-                    lines = structure.split("\n")
-                    essential_lines = []
-                    for line in lines:
-                        # Skip hint lines, empty lines, and file header
-                        if line.startswith("💡") or line.startswith("File:"):
-                            continue
-                        if line.strip():
-                            essential_lines.append(line)
-
-                    # Limit to 30 lines per file to keep it compact
-                    structure = "\n".join(essential_lines[:30])
-                    _REPO_MAP_CACHE.set(path, structure)
-                else:
-                    structure = None
-            except Exception:
-                structure = None
+            structure = _summarize_structure(rel_path)
+            if structure is not None:
+                _REPO_MAP_CACHE.set(path, mtime, structure)
 
         if structure:
-            file_structures[str(rel_path)] = structure
+            file_structures[rel_path] = structure
 
-    # Mark that we've completed a scan
+    # Mark that we've completed a scan and persist any newly parsed files
     _REPO_MAP_CACHE.mark_scanned()
+    _REPO_MAP_CACHE.save()
 
     # Rank files (focus files first, then alphabetically)
     def rank_file(path: str) -> Tuple[int, str]:
@@ -219,14 +369,12 @@ def get_repo_map(
 
     for file_path in ranked_files[:max_files]:
         structure = file_structures[file_path]
-        output_lines.append(f"\n{file_path}:")
 
-        # Show structure (truncate if needed for extremely long files)
-        structure_preview = structure[:800]  # ~250 tokens max per file
+        # Show structure (truncate if needed for extremely long files, ~250 tokens max)
         if len(structure) > 800:
-            structure_preview += "\n  [... more symbols omitted ...]"
+            structure = structure[:800] + "\n  [... more symbols omitted ...]"
 
-        output_lines.append(structure_preview)
+        output_lines.append(f"\n{file_path}:\n{structure}")
 
     # Add footer with helpful information
     if total_files > max_files:
@@ -240,27 +388,28 @@ def get_repo_map(
 
     result = "\n".join(output_lines)
 
-    # Calculate rough token estimate (1 char ≈ 0.3 tokens for code)
-    estimated_tokens = len(result) // 3
-
-    # Log repo map generation
-    try:
-        from patchpal.tools.audit import log_action_result
-
-        log_action_result(
-            tool_name="repo_map_generation",
-            description=f"Generated repo map: {len(result):,} chars (~{estimated_tokens:,} tokens) for {total_files} files",
-            success=True,
-            context={
-                "char_count": len(result),
-                "estimated_tokens": estimated_tokens,
-                "total_files": total_files,
-                "focus_files_count": len(focus_set) if focus_set else 0,
-                "max_files": max_files,
-            },
-        )
-    except Exception:
-        pass  # Don't fail if audit logging fails
+    # Log repo map generation (skip building the entry when audit logging is off)
+    if config.AUDIT_LOG:
+        # Calculate rough token estimate (1 char ≈ 0.3 tokens for code)
+        char_count = len(result)
+        estimated_tokens = char_count // 3
+        try:
+            from patchpal.tools.audit import log_action_result
+
+            log_action_result(
+                tool_name="repo_map_generation",
+                description=f"Generated repo map: {char_count:,} chars (~{estimated_tokens:,} tokens) for {total_files} files",
+                success=True,
+                context={
+                    "char_count": char_count,
+                    "estimated_tokens": estimated_tokens,
+                    "total_files": total_files,
+                    "focus_files_count": len(focus_set) if focus_set else 0,
+                    "max_files": max_files,
+                },
+            )
+        except Exception:
+            pass  # Don't fail if audit logging fails
 
     return result
 
@@ -285,7 +434,12 @@ def clear_repo_map_cache():
     """Clear the repository map cache.
 
     Useful if files have been added/removed outside of PatchPal's awareness,
-    or if you want to force a fresh scan.
+    or if you want to force a fresh scan. Also removes the persisted cache file.
     """
     global _REPO_MAP_CACHE
-    _REPO_MAP_CACHE = RepoMapCache()
+    try:
+        REPO_MAP_CACHE_FILE.unlink()
+    except OSError:
+        pass
+    _REPO_MAP_CACHE = RepoMapCache(REPO_MAP_CACHE_FILE)
+    _REPO_MAP_CACHE.loaded = True
@@ -1,20 +1,53 @@
 """Shell command execution tools."""
 
+import platform
+import re
+import shlex
+import shutil
 import subprocess
-from typing import Optional
+from functools import lru_cache
+from typing import List, Optional
 
 from patchpal.config import config
 from patchpal.tools import common
 from patchpal.tools.common import (
-    DANGEROUS_PATTERNS,
-    DANGEROUS_TOKENS,
     OutputFilter,
     _get_permission_manager,
     _operation_limiter,
 )
 
+# Shell operators that separate sub-commands ("||" must come before "|")
+_COMPOUND_OPERATOR_RE = re.compile(r"(&&|\|\||;|\|)")
 
-def _extract_command_from_exec_wrapper(command_part: str) -> Optional[str]:
+# Shell wrappers that run a command string (sh -c, bash -c, ...), matched anywhere
+_SHELL_WRAPPER_RE = re.compile(r"(?:sh|bash|zsh|ksh|dash) -c", re.IGNORECASE)
+
+# Commands that change directory or set context (not the actual operation)
+_CONTEXT_COMMANDS = frozenset({"cd", "pushd", "popd"})
+_SETUP_COMMANDS = frozenset({"export", "set", "unset", "source", "."})
+
+# Length of the longest wrapper prefix matched with startswith ("powershell -command")
+_WRAPPER_PREFIX_LEN = len("powershell -command")
+
+
+def _split_command(command_part: str) -> List[str]:
+    """Split a single sub-command into words, honoring shell quoting where possible.
+
+    Quoted arguments such as ``cd "my dir"`` stay one word. Falls back to a plain
+    whitespace split on Windows (backslashes are path separators there, not escapes)
+    and when the quoting is unbalanced, e.g. because an operator split a quoted string.
+    """
+    if platform.system() != "Windows":
+        try:
+            return shlex.split(command_part)
+        except ValueError:
+            pass
+    return command_part.split()
+
+
+def _extract_command_from_exec_wrapper(
+    command_part: str, tokens: Optional[List[str]] = None
+) -> Optional[str]:
     """Extract the actual command from execution wrappers like find -exec, xargs.
 
     These wrappers are security-sensitive because they can bypass the harmless
@@ -22,6 +55,7 @@ def _extract_command_from_exec_wrapper(command_part: str) -> Optional[str]:
 
     Args:
         command_part: A single command string (not compound)
+        tokens: command_part already split on whitespace, if the caller has it
 
     Returns:
         The extracted command if wrapper detected, None otherwise
@@ -34,44 +68,43 @@ def _extract_command_from_exec_wrapper(command_part: str) -> Optional[str]:
         >>> _extract_command_from_exec_wrapper("ls -la")
         None
     """
-    cmd_lower = command_part.strip().lower()
+    parts = tokens if tokens is not None else command_part.split()
+    if len(parts) < 2:
+        return None  # A bare "find" or "xargs" has no command to delegate to
+
+    # Dispatch on the first token only, instead of scanning the whole command
+    head = parts[0].lower()
 
     # find with -exec or -execdir: extract the command after -exec/-execdir
-    if cmd_lower.startswith("find "):
-        for exec_flag in ["-exec", "-execdir"]:
-            if exec_flag in cmd_lower:
-                # Find the position of -exec/-execdir
-                parts = command_part.split()
-                try:
-                    exec_idx = next(i for i, p in enumerate(parts) if p.lower() == exec_flag)
-                    if exec_idx + 1 < len(parts):
-                        # Extract the command and possibly the first flag (e.g., 'sed -n')
-                        executed_cmd = parts[exec_idx + 1]
-                        # Strip common path prefixes and get just the command name
-                        if "/" in executed_cmd:
-                            executed_cmd = executed_cmd.split("/")[-1]
-
-                        # Check if there's a flag right after the command (e.g., sed -n)
-                        # This allows matching multi-word patterns like 'sed -n' in harmless list
-                        if exec_idx + 2 < len(parts) and parts[exec_idx + 2].startswith("-"):
-                            # Include the flag for patterns like 'sed -n'
-                            executed_cmd = f"{executed_cmd} {parts[exec_idx + 2]}"
-
-                        return executed_cmd
-                except StopIteration:
-                    pass
+    if head == "find":
+        for exec_flag in ("-exec", "-execdir"):
+            # Find the position of -exec/-execdir (find primaries are case-sensitive)
+            try:
+                exec_idx = parts.index(exec_flag)
+            except ValueError:
+                continue
+            if exec_idx + 1 < len(parts):
+                # Extract the command and possibly the first flag (e.g., 'sed -n')
+                executed_cmd = parts[exec_idx + 1]
+                # Strip common path prefixes and get just the command name
+                executed_cmd = executed_cmd.rpartition("/")[2]
+
+                # Check if there's a flag right after the command (e.g., sed -n)
+                # This allows matching multi-word patterns like 'sed -n' in harmless list
+                if exec_idx + 2 < len(parts) and parts[exec_idx + 2].startswith("-"):
+                    # Include the flag for patterns like 'sed -n'
+                    executed_cmd = f"{executed_cmd} {parts[exec_idx + 2]}"
+
+                return executed_cmd
 
     # xargs: extract the command being executed
-    if cmd_lower.startswith("xargs "):
+    if head == "xargs":
         # xargs runs a command on each line of input
         # The command comes after xargs and its options
-        parts = command_part.split()
         # Skip 'xargs' and any options (start with -)
         for i in range(1, len(parts)):
             if not parts[i].startswith("-"):
-                executed_cmd = parts[i]
-                if "/" in executed_cmd:
-                    executed_cmd = executed_cmd.split("/")[-1]
+                executed_cmd = parts[i].rpartition("/")[2]
 
                 # Check if there's a flag right after the command (e.g., sed -n)
                 if i + 1 < len(parts) and parts[i + 1].startswith("-"):
@@ -84,6 +117,97 @@ def _extract_command_from_exec_wrapper(command_part: str) -> Optional[str]:
     return None
 
 
+# Characters that need a shell to interpret them: operators, redirection, grouping,
+# expansions, globs, escapes and comments
+_SHELL_SYNTAX_CHARS = frozenset("|&;<>()$`\\*?[]{}~#!\n")
+
+# Shell builtins (POSIX sh plus common bash/dash ones). Several also exist as
+# binaries on PATH (echo, printf, test, pwd, kill, ...) but behave differently
+# from the builtin, so these always go through the shell to keep the output the same
+_SHELL_BUILTINS = frozenset(
+    {
+        ".",
+        ":",
+        "alias",
+        "bg",
+        "break",
+        "builtin",
+        "cd",
+        "command",
+        "continue",
+        "declare",
+        "echo",
+        "eval",
+        "exec",
+        "exit",
+        "export",
+        "false",
+        "fc",
+        "fg",
+        "getopts",
+        "hash",
+        "jobs",
+        "kill",
+        "local",
+        "newgrp",
+        "printf",
+        "pwd",
+        "read",
+        "readonly",
+        "return",
+        "set",
+        "shift",
+        "source",
+        "test",
+        "times",
+        "trap",
+        "true",
+        "type",
+        "ulimit",
+        "umask",
+        "unalias",
+        "unset",
+        "wait",
+    }
+)
+
+
+def _simple_command_argv(cmd: str) -> Optional[List[str]]:
+    """Return an argv list for a command that can be executed without a shell.
+
+    Plain commands like ``ls -la`` or ``pytest tests/`` don't need ``/bin/sh`` to
+    parse them, so running them directly saves spawning a shell process.
+
+    Args:
+        cmd: The shell command string
+
+    Returns:
+        The argument list, or None if the command needs a shell (shell syntax,
+        environment assignments, builtins, relative program paths, or Windows)
+    """
+    if platform.system() == "Windows" or not _SHELL_SYNTAX_CHARS.isdisjoint(cmd):
+        return None
+
+    try:
+        argv = shlex.split(cmd)
+    except ValueError:
+        return None  # e.g. unbalanced quotes - let the shell report it
+
+    # Skip VAR=value prefixes, paths (resolved against a different cwd by which()),
+    # shell builtins (even when a same-named binary exists), and anything not on PATH
+    if (
+        not argv
+        or "=" in argv[0]
+        or "/" in argv[0]
+        or argv[0] in _SHELL_BUILTINS
+        or shutil.which(argv[0]) is None
+    ):
+        return None
+    return argv
+
+
+# Pure function of the command string; agents re-run the same commands often
+@lru_cache(maxsize=256)
 def _extract_shell_command_info(cmd: str) -> tuple[Optional[str], Optional[str]]:
     """Extract the meaningful command pattern and working directory from a shell command.
 
@@ -112,22 +236,25 @@ def _extract_shell_command_info(cmd: str) -> tuple[Optional[str], Optional[str]]
         >>> _extract_shell_command_info("xargs rm -rf")
         ('rm', None)
     """
-    if not cmd or not cmd.strip():
+    if not cmd or cmd.isspace():
         return None, None
 
     # First, check for command execution wrappers that delegate to other commands
     # These are security-sensitive because they can bypass the harmless command list
-    cmd_lower = cmd.strip().lower()
+    stripped = cmd.strip()
+    # Only the leading characters are needed for the prefix checks below, so avoid
+    # lowercasing the whole command
+    prefix_lower = stripped[:_WRAPPER_PREFIX_LEN].lower()
 
     # powershell -Command or pwsh -Command: extract the PowerShell cmdlet
     # Examples: powershell -Command "Get-ChildItem", pwsh -c "Select-String"
     # IMPORTANT: Check this BEFORE sh -c to avoid matching "sh -c" inside "pwsh -Command"
     # Check longer patterns first to avoid substring matching issues
     for ps_prefix in ["powershell -command", "pwsh -command", "powershell -c", "pwsh -c"]:
-        if cmd_lower.startswith(ps_prefix):
+        if prefix_lower.startswith(ps_prefix):
             # Find what comes after the -Command/-c flag
             idx = len(ps_prefix)
-            remainder = cmd[idx:].strip()
+            remainder = stripped[idx:].strip()
             # The command is usually in quotes, extract first token
             if remainder:
                 # Remove leading and trailing quotes
@@ -138,27 +265,26 @@ def _extract_shell_command_info(cmd: str) -> tuple[Optional[str], Optional[str]]
                     first_token = tokens[0].lower()
                     return first_token, None
 
-    # sh -c, bash -c, etc.: extract the command string
-    for shell_cmd in ["sh -c", "bash -c", "zsh -c", "ksh -c", "dash -c"]:
-        if shell_cmd in cmd_lower:
-            # Find what comes after the -c flag
-            idx = cmd_lower.index(shell_cmd) + len(shell_cmd)
-            remainder = cmd[idx:].strip()
-            # The command is usually in quotes, extract first token and possibly flag
-            if remainder:
-                # Remove leading quotes
-                remainder = remainder.lstrip("\"'")
-                tokens = remainder.split()
-                if tokens:
-                    first_token = tokens[0]
-                    # Check if there's a flag (e.g., sed -n)
-                    if len(tokens) > 1 and tokens[1].startswith("-"):
-                        first_token = f"{first_token} {tokens[1]}"
-                    return first_token, None
+    # sh -c, bash -c, etc.: extract the command string (may appear anywhere in the command)
+    shell_match = _SHELL_WRAPPER_RE.search(stripped)
+    if shell_match:
+        # Find what comes after the -c flag
+        remainder = stripped[shell_match.end() :].strip()
+        # The command is usually in quotes, extract first token and possibly flag
+        if remainder:
+            # Remove leading quotes
+            remainder = remainder.lstrip("\"'")
+            tokens = remainder.split()
+            if tokens:
+                first_token = tokens[0]
+                # Check if there's a flag (e.g., sed -n)
+                if len(tokens) > 1 and tokens[1].startswith("-"):
+                    first_token = f"{first_token} {tokens[1]}"
+                return first_token, None
 
     # eval: extract the command being evaluated
-    if cmd_lower.startswith("eval "):
-        remainder = cmd[5:].strip().lstrip("\"'")
+    if prefix_lower.startswith("eval "):
+        remainder = stripped[5:].strip().lstrip("\"'")
         tokens = remainder.split()
         if tokens:
             first_token = tokens[0]
@@ -167,62 +293,40 @@ def _extract_shell_command_info(cmd: str) -> tuple[Optional[str], Optional[str]]
                 first_token = f"{first_token} {tokens[1]}"
             return first_token, None
 
-    # Shell operators that indicate compound commands
-    # Split by && and || first (they group tighter than ;)
-    compound_operators = ["&&", "||", ";"]
-
-    # Split by compound operators to find all sub-commands
-    commands = [cmd]
-    for op in compound_operators:
-        new_commands = []
-        for c in commands:
-            # Split but keep track of which parts are commands
-            parts = c.split(op)
-            new_commands.extend(parts)
-        commands = new_commands
-
-    # Now also handle pipes within each command
-    # Pipes are different - we want the first command in a pipe chain
-    pipe_split_commands = []
-    for c in commands:
-        pipe_parts = c.split("|")
-        # For pipes, we only care about the first command (before the pipe)
-        pipe_split_commands.append(pipe_parts[0])
-
-    commands = pipe_split_commands
-
-    # Commands that change directory or set context (not the actual operation)
-    context_commands = {"cd", "pushd", "popd"}
-    setup_commands = {"export", "set", "unset", "source", "."}
+    # Split by compound operators (&&, ||, ;) and pipes in a single pass.
+    # The captured operators are interleaved with the pieces, so parts[1::2] are
+    # operators and parts[2::2] the pieces that follow them.
+    parts = _COMPOUND_OPERATOR_RE.split(cmd)
+    # Pipes are different - we want the first command in a pipe chain,
+    # so drop every piece that follows a pipe
+    commands = [parts[0]]
+    commands.extend(piece for op, piece in zip(parts[1::2], parts[2::2]) if op != "|")
 
     # Track if we see a cd command and what directory it goes to
     working_dir = None
     primary_command = None
 
     for command_part in commands:
-        command_part = command_part.strip()
-        if not command_part:
-            continue
-
-        tokens = command_part.split()
+        # Split each sub-command once; the token list is shared with the wrapper check
+        tokens = _split_command(command_part)
         if not tokens:
             continue
 
         first_token = tokens[0]
 
         # If it's a cd command, extract the target directory
-        if first_token in context_commands:
+        if first_token in _CONTEXT_COMMANDS:
             if first_token == "cd" and len(tokens) > 1:
                 working_dir = tokens[1]
             continue
 
         # Skip setup commands
-        if first_token in setup_commands:
+        if first_token in _SETUP_COMMANDS:
             continue
 
         # Check if this command is an execution wrapper (find -exec, xargs, etc.)
         # Extract the actual command being executed for security purposes
-        extracted_cmd = _extract_command_from_exec_wrapper(command_part)
+        extracted_cmd = _extract_command_from_exec_wrapper(command_part, tokens)
         if extracted_cmd:
             primary_command = extracted_cmd
             # Don't break - keep looking for cd commands that might come after
@@ -236,14 +340,13 @@ def _extract_shell_command_info(cmd: str) -> tuple[Optional[str], Optional[str]]
             primary_command = first_token
             # If we already found the primary command, we're done
             # (don't need to look at commands after the main one)
-            if working_dir is not None or first_token not in context_commands:
+            if working_dir is not None or first_token not in _CONTEXT_COMMANDS:
                 break
 
     # If we didn't find a primary command (e.g., only "cd /tmp"), use first token
     if not primary_command:
-        first_command = commands[0].strip() if commands else ""
-        first_token = first_command.split()[0] if first_command.split() else None
-        primary_command = first_token
+        first_tokens = _split_command(commands[0]) if commands else []
+        primary_command = first_tokens[0] if first_tokens else None
 
     return primary_command, working_dir
 
@@ -283,10 +386,12 @@ def run_shell(cmd: str) -> str:
     _operation_limiter.check_limit(f"run_shell({cmd[:50]}...)")
 
     # Check for dangerous tokens (privilege escalation commands)
-    # Token-based matching: splits command and checks each token
-    if any(tok in DANGEROUS_TOKENS for tok in cmd.split()):
+    # Token-based matching: splits command once and checks it against the token set
+    dangerous_tokens = common.DANGEROUS_TOKENS
+    tokens = cmd.split()
+    if not dangerous_tokens.isdisjoint(tokens):
         error_msg = (
-            f"Blocked dangerous command: {cmd}\nForbidden operations: {', '.join(DANGEROUS_TOKENS)}"
+            f"Blocked dangerous command: {cmd}\nForbidden operations: {', '.join(dangerous_tokens)}"
         )
         # Log blocked command
         try:
@@ -296,52 +401,57 @@ def run_shell(cmd: str) -> str:
                 tool_name="run_shell",
                 description=f"Shell command: {cmd[:100]}",
                 reason="dangerous_command",
-                pattern=next((tok for tok in cmd.split() if tok in DANGEROUS_TOKENS), None),
+                pattern=next((tok for tok in tokens if tok in dangerous_tokens), None),
             )
         except Exception:
             pass  # Don't fail if audit logging fails
         raise ValueError(error_msg)
 
     # Check for dangerous patterns (destructive operations)
-    # Substring matching: checks if pattern appears anywhere in command
-    for pattern in DANGEROUS_PATTERNS:
-        if pattern in cmd:
-            error_msg = f"Blocked dangerous pattern in command: {pattern}\nFull command: {cmd}"
-            # Log blocked command
-            try:
-                from patchpal.tools.audit import log_action_blocked
+    # Substring matching: one precompiled scan finds any pattern anywhere in command
+    pattern_re = common.DANGEROUS_PATTERN_RE
+    match = pattern_re.search(cmd) if pattern_re else None
+    if match:
+        pattern = match.group(0)
+        error_msg = f"Blocked dangerous pattern in command: {pattern}\nFull command: {cmd}"
+        # Log blocked command
+        try:
+            from patchpal.tools.audit import log_action_blocked
 
-                log_action_blocked(
-                    tool_name="run_shell",
-                    description=f"Shell command: {cmd[:100]}",
-                    reason="dangerous_pattern",
-                    pattern=pattern,
-                )
-            except Exception:
-                pass  # Don't fail if audit logging fails
-            raise ValueError(error_msg)
+            log_action_blocked(
+                tool_name="run_shell",
+                description=f"Shell command: {cmd[:100]}",
+                reason="dangerous_pattern",
+                pattern=pattern,
+            )
+        except Exception:
+            pass  # Don't fail if audit logging fails
+        raise ValueError(error_msg)
+
+    # Plain commands are executed directly; anything using shell syntax goes through sh
+    argv = _simple_command_argv(cmd)
 
+    # Merge stderr into stdout so only one buffer is captured (in the order it was written)
     result = subprocess.run(
-        cmd,
-        shell=True,
-        capture_output=True,
+        argv if argv is not None else cmd,
+        shell=argv is None,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
         cwd=common.REPO_ROOT,
         timeout=config.SHELL_TIMEOUT,
     )
 
     # Decode output with error handling for problematic characters
     # Use utf-8 on all platforms with 'replace' to handle encoding issues
-    stdout = result.stdout.decode("utf-8", errors="replace") if result.stdout else ""
-    stderr = result.stderr.decode("utf-8", errors="replace") if result.stderr else ""
-
-    output = stdout + stderr
+    output = result.stdout.decode("utf-8", errors="replace") if result.stdout else ""
 
     # Apply output filtering to reduce token usage
     if OutputFilter.should_filter(cmd):
         filtered_output = OutputFilter.filter_output(cmd, output)
         # Log if we filtered significantly (>50% reduction)
-        original_lines = len(output.split("\n"))
-        filtered_lines = len(filtered_output.split("\n"))
+        # Count newlines rather than splitting, to avoid building line lists just for logging
+        original_lines = output.count("\n") + 1
+        filtered_lines = filtered_output.count("\n") + 1
         if filtered_lines < original_lines * 0.5:
             try:
                 from patchpal.tools.audit import log_action_result
@@ -94,6 +94,9 @@ BINARY_MAGIC_NUMBERS = {
     b"\xcf\xfa\xed\xfe": "Mach-O executable (reverse byte order)",
 }
 
+# All signatures as one tuple: bytes.startswith checks them in a single call
+_BINARY_MAGIC_PREFIXES = tuple(BINARY_MAGIC_NUMBERS)
+
 
 def _detect_binary(content: bytes, content_type: str) -> tuple[bool, str | None]:
     """Detect binary content by magic numbers (more reliable than Content-Type).
@@ -105,10 +108,11 @@ def _detect_binary(content: bytes, content_type: str) -> tuple[bool, str | None]
     Returns:
         (is_binary, description) tuple
     """
-    # Check magic numbers first (most reliable)
-    for magic, description in BINARY_MAGIC_NUMBERS.items():
-        if content.startswith(magic):
-            return True, description
+    # Check magic numbers first (most reliable); only look up which one on a hit
+    if content.startswith(_BINARY_MAGIC_PREFIXES):
+        for magic, description in BINARY_MAGIC_NUMBERS.items():
+            if content.startswith(magic):
+                return True, description
 
     # Fallback to Content-Type checking (can be spoofed, but still useful)
     binary_content_types = [
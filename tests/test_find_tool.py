@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """Tests for the find tool - both glob pattern matching and ls-like listing."""
 
+import os
 import time
 
 import pytest
@@ -176,6 +177,22 @@ def test_find_respects_gitignore(test_dir, monkeypatch):
     print("✓ find() respects .gitignore patterns")
 
 
+def test_is_gitignored_compiled_patterns(tmp_path):
+    """Test gitignore matching on full paths and path components with compiled patterns."""
+    from patchpal.tools.find_tool import _compile_gitignore_patterns, _is_gitignored
+
+    compiled = _compile_gitignore_patterns(["*.pyc", "build/", "docs/_site", "!keep.pyc"])
+
+    assert _is_gitignored(tmp_path / "pkg" / "mod.pyc", tmp_path, compiled)
+    assert _is_gitignored(tmp_path / "keep.pyc", tmp_path, compiled)  # Negation not supported
+    assert _is_gitignored(tmp_path / "build" / "out.txt", tmp_path, compiled)
+    assert _is_gitignored(tmp_path / "docs" / "_site", tmp_path, compiled)
+    assert not _is_gitignored(tmp_path / "src" / "main.py", tmp_path, compiled)
+    assert not _is_gitignored(
+        tmp_path / "src" / "main.py", tmp_path, _compile_gitignore_patterns([])
+    )
+
+
 def test_find_sorts_by_modification_time(test_dir, monkeypatch):
     """Test that find returns files sorted by modification time (newest first)."""
     import patchpal.tools.find_tool
@@ -186,11 +203,15 @@ def test_find_sorts_by_modification_time(test_dir, monkeypatch):
     # Create files with different modification times in root
     file1 = test_dir / "zzz_old_file.dat"
     file1.write_text("old")
-    time.sleep(0.3)  # Increase sleep time for more reliable test
 
     file2 = test_dir / "zzz_new_file.dat"
     file2.write_text("new")
 
+    # Set mtimes explicitly instead of sleeping between writes
+    now = time.time()
+    os.utime(file1, (now - 60, now - 60))
+    os.utime(file2, (now, now))
+
     # Get modification times
     mtime1 = file1.stat().st_mtime
     mtime2 = file2.stat().st_mtime
@@ -241,5 +262,42 @@ def test_find_no_matches_returns_message(test_dir, monkeypatch):
     print("✓ find() returns message when no matches found")
 
 
+def test_depth_limited_walk_skips_hidden_dirs_only_below_root(tmp_path):
+    """Test that depth_limited_walk prunes hidden subdirectories but not a hidden ancestor."""
+    from patchpal.tools.common import depth_limited_walk
+
+    root = tmp_path / ".workspace" / "repo"
+    (root / "src").mkdir(parents=True)
+    (root / "src" / "main.py").write_text("print('main')")
+    (root / ".git").mkdir()
+    (root / ".git" / "config").write_text("git config")
+
+    found = {p.relative_to(root).as_posix() for p in depth_limited_walk(root, 2)}
+
+    assert "src/main.py" in found
+    assert ".git" in found  # Listed, but not descended into
+    assert ".git/config" not in found
+
+
+def test_find_max_depth_descends_from_hidden_root(test_dir, monkeypatch):
+    """Test that a depth-limited find rooted at a hidden directory searches its subdirectories."""
+    import patchpal.tools.find_tool
+
+    monkeypatch.setattr(patchpal.tools.find_tool, "REPO_ROOT", test_dir)
+    from patchpal.tools.find_tool import find
+
+    (test_dir / ".github" / "workflows").mkdir(parents=True)
+    (test_dir / ".github" / "workflows" / "ci.yml").write_text("on: push")
+    (test_dir / ".github" / "workflows" / ".cache").mkdir()
+    (test_dir / ".github" / "workflows" / ".cache" / "old.yml").write_text("stale")
+
+    files = find("*.yml", path=".github", max_depth=3).split("\n")
+    assert [f.replace("\\", "/") for f in files] == [".github/workflows/ci.yml"]
+
+    # A path below the hidden directory is walked the same way
+    files = find("*.yml", path=".github/workflows", max_depth=3).split("\n")
+    assert [f.replace("\\", "/") for f in files] == [".github/workflows/ci.yml"]
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -11,69 +11,53 @@ def mock_memory_file(tmp_path, monkeypatch):
     return fake_memory
 
 
+@pytest.fixture(scope="module")
+def agent(tmp_path_factory):
+    """One agent shared by the filtering tests.
+
+    filter_images_if_blocked reads PATCHPAL_BLOCK_IMAGES on each call, so tests only
+    need to set the env var, not build a new agent.
+    """
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("PATCHPAL_ENABLE_MCP", "false")
+        mp.setattr(
+            "patchpal.tools.common.MEMORY_FILE",
+            tmp_path_factory.mktemp("nonexistent") / "MEMORY.md",
+        )
+
+        from patchpal.agent import PatchPalAgent
+
+        yield PatchPalAgent(model_id="anthropic/claude-sonnet-4-5")
+
+
 def test_block_images_disabled_by_default(monkeypatch):
     """Test that BLOCK_IMAGES is disabled by default (images pass through)."""
     # Ensure env var is not set
     monkeypatch.delenv("PATCHPAL_BLOCK_IMAGES", raising=False)
 
-    # Reload config to pick up env change
-    import sys
-
-    if "patchpal.agent" in sys.modules:
-        del sys.modules["patchpal.agent"]
-    if "patchpal.config" in sys.modules:
-        del sys.modules["patchpal.config"]
-
+    # Config properties read the environment on access, so no reload is needed
     from patchpal.config import config
 
     # Verify default is false
     assert config.BLOCK_IMAGES is False
 
 
-def test_block_images_config_values(monkeypatch):
+@pytest.mark.parametrize(
+    "value,expected",
+    [(v, True) for v in ["true", "True", "TRUE", "1", "yes", "Yes"]]
+    + [(v, False) for v in ["false", "False", "FALSE", "0", "no", "No"]],
+)
+def test_block_images_config_values(monkeypatch, value, expected):
     """Test that BLOCK_IMAGES config accepts various true/false values."""
     from patchpal.config import config
 
-    # Test true values
-    for true_value in ["true", "True", "TRUE", "1", "yes", "Yes"]:
-        monkeypatch.setenv("PATCHPAL_BLOCK_IMAGES", true_value)
-        # Reload config module
-        from importlib import reload
-
-        import patchpal.config as config_module
-
-        reload(config_module)
-        assert config.BLOCK_IMAGES is True, f"Failed for value: {true_value}"
-
-    # Test false values
-    for false_value in ["false", "False", "FALSE", "0", "no", "No"]:
-        monkeypatch.setenv("PATCHPAL_BLOCK_IMAGES", false_value)
-        # Reload config module
-        from importlib import reload
+    monkeypatch.setenv("PATCHPAL_BLOCK_IMAGES", value)
+    assert config.BLOCK_IMAGES is expected
 
-        import patchpal.config as config_module
 
-        reload(config_module)
-        from patchpal.config import config
-
-        assert config.BLOCK_IMAGES is False, f"Failed for value: {false_value}"
-
-
-def test_filter_images_disabled(monkeypatch):
+def test_filter_images_disabled(monkeypatch, agent):
     """Test that images pass through when BLOCK_IMAGES=false."""
     monkeypatch.setenv("PATCHPAL_BLOCK_IMAGES", "false")
-    monkeypatch.setenv("PATCHPAL_ENABLE_MCP", "false")
-
-    # Reload modules
-    import sys
-
-    for module in ["patchpal.config", "patchpal.agent"]:
-        if module in sys.modules:
-            del sys.modules[module]
-
-    from patchpal.agent import PatchPalAgent
-
-    agent = PatchPalAgent(model_id="anthropic/claude-sonnet-4-5")
 
     # Simulate messages with images
     messages = [
@@ -103,21 +87,9 @@ def test_filter_images_disabled(monkeypatch):
     assert filtered[1]["content"][1]["type"] == "image_url"
 
 
-def test_filter_images_enabled(monkeypatch):
+def test_filter_images_enabled(monkeypatch, agent):
     """Test that images are replaced when BLOCK_IMAGES=true."""
     monkeypatch.setenv("PATCHPAL_BLOCK_IMAGES", "true")
-    monkeypatch.setenv("PATCHPAL_ENABLE_MCP", "false")
-
-    # Reload modules
-    import sys
-
-    for module in ["patchpal.config", "patchpal.agent"]:
-        if module in sys.modules:
-            del sys.modules[module]
-
-    from patchpal.agent import PatchPalAgent
-
-    agent = PatchPalAgent(model_id="anthropic/claude-sonnet-4-5")
 
     # Simulate messages with images
     messages = [
@@ -149,21 +121,9 @@ def test_filter_images_enabled(monkeypatch):
     assert "[Image blocked" in filtered[1]["content"][1]["text"]
 
 
-def test_filter_images_deduplication(monkeypatch):
+def test_filter_images_deduplication(monkeypatch, agent):
     """Test that consecutive image placeholders are deduplicated."""
     monkeypatch.setenv("PATCHPAL_BLOCK_IMAGES", "true")
-    monkeypatch.setenv("PATCHPAL_ENABLE_MCP", "false")
-
-    # Reload modules
-    import sys
-
-    for module in ["patchpal.config", "patchpal.agent"]:
-        if module in sys.modules:
-            del sys.modules[module]
-
-    from patchpal.agent import PatchPalAgent
-
-    agent = PatchPalAgent(model_id="anthropic/claude-sonnet-4-5")
 
     # Multiple consecutive images
     messages = [
@@ -190,21 +150,9 @@ def test_filter_images_deduplication(monkeypatch):
     assert "[Image blocked" in filtered[0]["content"][2]["text"]
 
 
-def test_filter_images_preserves_text(monkeypatch):
+def test_filter_images_preserves_text(monkeypatch, agent):
     """Test that text content is preserved when filtering images."""
     monkeypatch.setenv("PATCHPAL_BLOCK_IMAGES", "true")
-    monkeypatch.setenv("PATCHPAL_ENABLE_MCP", "false")
-
-    # Reload modules
-    import sys
-
-    for module in ["patchpal.config", "patchpal.agent"]:
-        if module in sys.modules:
-            del sys.modules[module]
-
-    from patchpal.agent import PatchPalAgent
-
-    agent = PatchPalAgent(model_id="anthropic/claude-sonnet-4-5")
 
     # Mixed text and images
     messages = [
@@ -229,21 +177,9 @@ def test_filter_images_preserves_text(monkeypatch):
     assert filtered[0]["content"][2]["text"] == "Second text"
 
 
-def test_filter_images_only_affects_user_and_tool_messages(monkeypatch):
+def test_filter_images_only_affects_user_and_tool_messages(monkeypatch, agent):
     """Test that filtering only applies to user and tool messages."""
     monkeypatch.setenv("PATCHPAL_BLOCK_IMAGES", "true")
-    monkeypatch.setenv("PATCHPAL_ENABLE_MCP", "false")
-
-    # Reload modules
-    import sys
-
-    for module in ["patchpal.config", "patchpal.agent"]:
-        if module in sys.modules:
-            del sys.modules[module]
-
-    from patchpal.agent import PatchPalAgent
-
-    agent = PatchPalAgent(model_id="anthropic/claude-sonnet-4-5")
 
     # Messages with different roles
     messages = [
@@ -266,21 +202,9 @@ def test_filter_images_only_affects_user_and_tool_messages(monkeypatch):
     assert "[Image blocked" in filtered[2]["content"][0]["text"]
 
 
-def test_filter_images_handles_string_content(monkeypatch):
+def test_filter_images_handles_string_content(monkeypatch, agent):
     """Test that filtering handles messages with string content (not list)."""
     monkeypatch.setenv("PATCHPAL_BLOCK_IMAGES", "true")
-    monkeypatch.setenv("PATCHPAL_ENABLE_MCP", "false")
-
-    # Reload modules
-    import sys
-
-    for module in ["patchpal.config", "patchpal.agent"]:
-        if module in sys.modules:
-            del sys.modules[module]
-
-    from patchpal.agent import PatchPalAgent
-
-    agent = PatchPalAgent(model_id="anthropic/claude-sonnet-4-5")
 
     # Messages with string content (not multimodal)
     messages = [
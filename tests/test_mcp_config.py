@@ -1,11 +1,13 @@
 """Test MCP configuration loading and merging."""
 
 import json
-from pathlib import Path
+import os
+from types import SimpleNamespace
 
 import pytest
 
-from patchpal.tools.mcp import _load_mcp_config
+from patchpal.tools import mcp
+from patchpal.tools.mcp import _load_mcp_config, _merge_mcp_configs
 
 
 def test_load_mcp_config_explicit_path(tmp_path):
@@ -42,11 +44,39 @@ def test_load_mcp_config_explicit_path_invalid_json(tmp_path):
     assert result == {}
 
 
-def test_load_mcp_config_global_only(tmp_path, monkeypatch):
-    """Test loading config from global location only."""
-    global_config = tmp_path / ".patchpal" / "mcp-config.json"
-    global_config.parent.mkdir(parents=True)
+def set_home(monkeypatch, path):
+    """Point Path.home() at path via the environment (USERPROFILE is used on Windows)."""
+    monkeypatch.setenv("HOME", str(path))
+    monkeypatch.setenv("USERPROFILE", str(path))
+
+
+@pytest.fixture
+def make_configs(tmp_path, monkeypatch):
+    """Write global and/or project configs and run from the project directory.
+
+    Returns a function taking the global and project config contents: a dict is written
+    as JSON, a string is written as-is (e.g. invalid JSON), and None skips that file.
+    """
+    project_dir = tmp_path / "project"
+    project_dir.mkdir()
+    monkeypatch.chdir(project_dir)
+    set_home(monkeypatch, tmp_path)
+
+    def _write(path, data):
+        if data is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(data if isinstance(data, str) else json.dumps(data))
+
+    def _make(global_data=None, project_data=None):
+        _write(tmp_path / ".patchpal" / "mcp-config.json", global_data)
+        _write(project_dir / ".patchpal" / "mcp-config.json", project_data)
+
+    return _make
 
+
+def test_load_mcp_config_global_only(make_configs):
+    """Test loading config from global location only."""
     config_data = {
         "mcp": {
             "global_server": {
@@ -56,25 +86,14 @@ def test_load_mcp_config_global_only(tmp_path, monkeypatch):
             }
         }
     }
-    global_config.write_text(json.dumps(config_data))
-
-    # Change to a directory where no project config exists
-    project_dir = tmp_path / "project"
-    project_dir.mkdir()
-    monkeypatch.chdir(project_dir)
-    monkeypatch.setattr(Path, "home", lambda: tmp_path)
+    make_configs(global_data=config_data)
 
     result = _load_mcp_config()
     assert result == config_data
 
 
-def test_load_mcp_config_project_only(tmp_path, monkeypatch):
+def test_load_mcp_config_project_only(make_configs):
     """Test loading config from project location only."""
-    project_dir = tmp_path / "project"
-    project_dir.mkdir()
-    project_config = project_dir / ".patchpal" / "mcp-config.json"
-    project_config.parent.mkdir(parents=True)
-
     config_data = {
         "mcp": {
             "project_server": {
@@ -84,20 +103,14 @@ def test_load_mcp_config_project_only(tmp_path, monkeypatch):
             }
         }
     }
-    project_config.write_text(json.dumps(config_data))
-
-    monkeypatch.chdir(project_dir)
-    monkeypatch.setattr(Path, "home", lambda: tmp_path / "fake_home")
+    make_configs(project_data=config_data)
 
     result = _load_mcp_config()
     assert result == config_data
 
 
-def test_load_mcp_config_merge_different_servers(tmp_path, monkeypatch):
+def test_load_mcp_config_merge_different_servers(make_configs):
     """Test merging configs with different server names."""
-    # Create global config
-    global_config = tmp_path / ".patchpal" / "mcp-config.json"
-    global_config.parent.mkdir(parents=True)
     global_data = {
         "mcp": {
             "global_server": {
@@ -107,13 +120,6 @@ def test_load_mcp_config_merge_different_servers(tmp_path, monkeypatch):
             }
         }
     }
-    global_config.write_text(json.dumps(global_data))
-
-    # Create project config
-    project_dir = tmp_path / "project"
-    project_dir.mkdir()
-    project_config = project_dir / ".patchpal" / "mcp-config.json"
-    project_config.parent.mkdir(parents=True)
     project_data = {
         "mcp": {
             "project_server": {
@@ -123,10 +129,7 @@ def test_load_mcp_config_merge_different_servers(tmp_path, monkeypatch):
             }
         }
     }
-    project_config.write_text(json.dumps(project_data))
-
-    monkeypatch.chdir(project_dir)
-    monkeypatch.setattr(Path, "home", lambda: tmp_path)
+    make_configs(global_data, project_data)
 
     result = _load_mcp_config()
 
@@ -137,11 +140,8 @@ def test_load_mcp_config_merge_different_servers(tmp_path, monkeypatch):
     assert result["mcp"]["project_server"]["command"] == ["python", "-m", "test_server"]
 
 
-def test_load_mcp_config_merge_override_server(tmp_path, monkeypatch):
+def test_merge_mcp_configs_override_server():
     """Test project config overriding global config for same server name."""
-    # Create global config
-    global_config = tmp_path / ".patchpal" / "mcp-config.json"
-    global_config.parent.mkdir(parents=True)
     global_data = {
         "mcp": {
             "shared_server": {
@@ -151,13 +151,7 @@ def test_load_mcp_config_merge_override_server(tmp_path, monkeypatch):
             }
         }
     }
-    global_config.write_text(json.dumps(global_data))
-
-    # Create project config with same server name
-    project_dir = tmp_path / "project"
-    project_dir.mkdir()
-    project_config = project_dir / ".patchpal" / "mcp-config.json"
-    project_config.parent.mkdir(parents=True)
+    # Project config with same server name
     project_data = {
         "mcp": {
             "shared_server": {
@@ -168,23 +162,15 @@ def test_load_mcp_config_merge_override_server(tmp_path, monkeypatch):
             }
         }
     }
-    project_config.write_text(json.dumps(project_data))
-
-    monkeypatch.chdir(project_dir)
-    monkeypatch.setattr(Path, "home", lambda: tmp_path)
-
-    result = _load_mcp_config()
+    result = _merge_mcp_configs(global_data, project_data)
 
     # Project config should override global
     assert result["mcp"]["shared_server"]["url"] == "https://project-override.com"
     assert result["mcp"]["shared_server"]["headers"] == {"Authorization": "Bearer token"}
 
 
-def test_load_mcp_config_disable_global_server(tmp_path, monkeypatch):
+def test_merge_mcp_configs_disable_global_server():
     """Test project config disabling a global server."""
-    # Create global config
-    global_config = tmp_path / ".patchpal" / "mcp-config.json"
-    global_config.parent.mkdir(parents=True)
     global_data = {
         "mcp": {
             "global_server": {
@@ -194,13 +180,7 @@ def test_load_mcp_config_disable_global_server(tmp_path, monkeypatch):
             }
         }
     }
-    global_config.write_text(json.dumps(global_data))
-
-    # Create project config that disables the server
-    project_dir = tmp_path / "project"
-    project_dir.mkdir()
-    project_config = project_dir / ".patchpal" / "mcp-config.json"
-    project_config.parent.mkdir(parents=True)
+    # Project config that disables the server
     project_data = {
         "mcp": {
             "global_server": {
@@ -208,46 +188,28 @@ def test_load_mcp_config_disable_global_server(tmp_path, monkeypatch):
             }
         }
     }
-    project_config.write_text(json.dumps(project_data))
-
-    monkeypatch.chdir(project_dir)
-    monkeypatch.setattr(Path, "home", lambda: tmp_path)
-
-    result = _load_mcp_config()
+    result = _merge_mcp_configs(global_data, project_data)
 
     # Server should be disabled
     assert result["mcp"]["global_server"]["enabled"] is False
     # Note: In a full override, only "enabled" key is present from project config
 
 
-def test_load_mcp_config_merge_other_keys(tmp_path, monkeypatch):
+def test_merge_mcp_configs_other_keys():
     """Test merging non-mcp config keys (for future extensibility)."""
-    # Create global config with multiple keys
-    global_config = tmp_path / ".patchpal" / "mcp-config.json"
-    global_config.parent.mkdir(parents=True)
+    # Global config with multiple keys
     global_data = {
         "mcp": {"server1": {"type": "remote", "url": "https://global.com"}},
         "defaults": {"model": "gpt-4"},
         "global_setting": "value1",
     }
-    global_config.write_text(json.dumps(global_data))
-
-    # Create project config with overlapping keys
-    project_dir = tmp_path / "project"
-    project_dir.mkdir()
-    project_config = project_dir / ".patchpal" / "mcp-config.json"
-    project_config.parent.mkdir(parents=True)
+    # Project config with overlapping keys
     project_data = {
         "mcp": {"server2": {"type": "local", "command": ["test"]}},
         "defaults": {"model": "claude-3"},
         "project_setting": "value2",
     }
-    project_config.write_text(json.dumps(project_data))
-
-    monkeypatch.chdir(project_dir)
-    monkeypatch.setattr(Path, "home", lambda: tmp_path)
-
-    result = _load_mcp_config()
+    result = _merge_mcp_configs(global_data, project_data)
 
     # MCP servers should be merged
     assert "server1" in result["mcp"]
@@ -259,18 +221,8 @@ def test_load_mcp_config_merge_other_keys(tmp_path, monkeypatch):
     assert "global_setting" in result  # Still present from global
 
 
-def test_load_mcp_config_global_invalid_json(tmp_path, monkeypatch):
+def test_load_mcp_config_global_invalid_json(make_configs):
     """Test handling invalid JSON in global config."""
-    # Create invalid global config
-    global_config = tmp_path / ".patchpal" / "mcp-config.json"
-    global_config.parent.mkdir(parents=True)
-    global_config.write_text("{invalid json")
-
-    # Create valid project config
-    project_dir = tmp_path / "project"
-    project_dir.mkdir()
-    project_config = project_dir / ".patchpal" / "mcp-config.json"
-    project_config.parent.mkdir(parents=True)
     project_data = {
         "mcp": {
             "project_server": {
@@ -279,10 +231,7 @@ def test_load_mcp_config_global_invalid_json(tmp_path, monkeypatch):
             }
         }
     }
-    project_config.write_text(json.dumps(project_data))
-
-    monkeypatch.chdir(project_dir)
-    monkeypatch.setattr(Path, "home", lambda: tmp_path)
+    make_configs("{invalid json", project_data)
 
     result = _load_mcp_config()
 
@@ -290,11 +239,8 @@ def test_load_mcp_config_global_invalid_json(tmp_path, monkeypatch):
     assert result == project_data
 
 
-def test_load_mcp_config_project_invalid_json(tmp_path, monkeypatch):
+def test_load_mcp_config_project_invalid_json(make_configs):
     """Test handling invalid JSON in project config."""
-    # Create valid global config
-    global_config = tmp_path / ".patchpal" / "mcp-config.json"
-    global_config.parent.mkdir(parents=True)
     global_data = {
         "mcp": {
             "global_server": {
@@ -303,17 +249,7 @@ def test_load_mcp_config_project_invalid_json(tmp_path, monkeypatch):
             }
         }
     }
-    global_config.write_text(json.dumps(global_data))
-
-    # Create invalid project config
-    project_dir = tmp_path / "project"
-    project_dir.mkdir()
-    project_config = project_dir / ".patchpal" / "mcp-config.json"
-    project_config.parent.mkdir(parents=True)
-    project_config.write_text("{invalid json")
-
-    monkeypatch.chdir(project_dir)
-    monkeypatch.setattr(Path, "home", lambda: tmp_path)
+    make_configs(global_data, "{invalid json")
 
     result = _load_mcp_config()
 
@@ -321,44 +257,123 @@ def test_load_mcp_config_project_invalid_json(tmp_path, monkeypatch):
     assert result == global_data
 
 
-def test_load_mcp_config_no_configs(tmp_path, monkeypatch):
+def test_load_mcp_config_no_configs(make_configs):
     """Test loading when no configs exist."""
-    project_dir = tmp_path / "project"
-    project_dir.mkdir()
-    monkeypatch.chdir(project_dir)
-    monkeypatch.setattr(Path, "home", lambda: tmp_path / "fake_home")
+    make_configs()
 
     result = _load_mcp_config()
     assert result == {}
 
 
-def test_load_mcp_config_empty_mcp_section(tmp_path, monkeypatch):
+def test_load_mcp_config_reparses_changed_file(tmp_path):
+    """Test that the parsed config cache is invalidated when the file changes."""
+    config_file = tmp_path / "config.json"
+    config_file.write_text(json.dumps({"mcp": {"a": {"type": "remote"}}}))
+
+    first = _load_mcp_config(config_file)
+    assert list(first["mcp"]) == ["a"]
+
+    config_file.write_text(json.dumps({"mcp": {"a": {"type": "remote"}, "b": {"type": "local"}}}))
+
+    second = _load_mcp_config(config_file)
+    assert list(second["mcp"]) == ["a", "b"]
+
+
+def test_load_mcp_config_merge_does_not_mutate_cached_global(tmp_path, monkeypatch, make_configs):
+    """Test that merging project servers leaves the cached global config untouched."""
+    global_data = {"mcp": {"shared": {"type": "remote"}, "global_server": {"type": "remote"}}}
+    make_configs(
+        global_data,
+        {"mcp": {"shared": {"type": "local"}, "project_server": {"type": "local"}}},
+    )
+
+    merged = _load_mcp_config()
+    assert set(merged["mcp"]) == {"shared", "global_server", "project_server"}
+    assert merged["mcp"]["shared"] == {"type": "local"}
+
+    # The cached global dict still holds exactly what is on disk
+    global_path = tmp_path / ".patchpal" / "mcp-config.json"
+    assert mcp._config_file_cache[os.path.abspath(global_path)][1] == global_data
+
+    # Same (cached) global config, merged with a different project's config
+    other_project = tmp_path / "other_project"
+    (other_project / ".patchpal").mkdir(parents=True)
+    (other_project / ".patchpal" / "mcp-config.json").write_text(
+        json.dumps({"mcp": {"other_server": {"type": "local"}}})
+    )
+    monkeypatch.chdir(other_project)
+
+    merged = _load_mcp_config()
+    assert set(merged["mcp"]) == {"shared", "global_server", "other_server"}
+    assert merged["mcp"]["shared"] == {"type": "remote"}
+    assert mcp._config_file_cache[os.path.abspath(global_path)][1] == global_data
+
+
+def test_merge_mcp_configs_empty_mcp_section():
     """Test merging when configs have empty or missing mcp sections."""
     # Global has mcp section, project doesn't
-    global_config = tmp_path / ".patchpal" / "mcp-config.json"
-    global_config.parent.mkdir(parents=True)
     global_data = {
         "mcp": {"server1": {"type": "remote", "url": "https://example.com"}},
         "other_setting": "value",
     }
-    global_config.write_text(json.dumps(global_data))
-
-    project_dir = tmp_path / "project"
-    project_dir.mkdir()
-    project_config = project_dir / ".patchpal" / "mcp-config.json"
-    project_config.parent.mkdir(parents=True)
     project_data = {"project_setting": "value2"}
-    project_config.write_text(json.dumps(project_data))
-
-    monkeypatch.chdir(project_dir)
-    monkeypatch.setattr(Path, "home", lambda: tmp_path)
-
-    result = _load_mcp_config()
+    result = _merge_mcp_configs(global_data, project_data)
 
     # Should have mcp from global and project setting
     assert "server1" in result["mcp"]
     assert result["project_setting"] == "value2"
 
 
+def test_merge_mcp_configs_missing_inputs():
+    """Test merging when one or both configs are absent."""
+    data = {"mcp": {"server1": {"type": "remote", "url": "https://example.com"}}}
+
+    assert _merge_mcp_configs(None, None) == {}
+    assert _merge_mcp_configs(data, None) == data
+    assert _merge_mcp_configs(None, data) == data
+
+
+class FakeTextContent:
+    """Stand-in for mcp.types.TextContent so the SDK is not required."""
+
+    def __init__(self, text):
+        self.text = text
+
+
+@pytest.mark.parametrize(
+    "result,expected",
+    [
+        (
+            SimpleNamespace(
+                messages=[
+                    SimpleNamespace(
+                        role="user",
+                        content=[FakeTextContent("hello"), SimpleNamespace(text="world")],
+                    )
+                ]
+            ),
+            "[user]: hello\n\n[user]: world",
+        ),
+        (
+            SimpleNamespace(
+                messages=[SimpleNamespace(role="assistant", content=FakeTextContent("single"))]
+            ),
+            "[assistant]: single",
+        ),
+        (
+            SimpleNamespace(messages=[SimpleNamespace(role="user", content="plain string")]),
+            "[user]: plain string",
+        ),
+        (SimpleNamespace(messages=[]), "Prompt executed successfully."),
+    ],
+    ids=["list-content", "single-object", "plain-string", "no-messages"],
+)
+def test_format_prompt_result(monkeypatch, result, expected):
+    """Test formatting of MCP prompt results for each content shape."""
+    monkeypatch.setattr(mcp, "TextContent", FakeTextContent)
+
+    assert mcp._format_prompt_result(result) == expected
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -62,6 +62,29 @@ def test_shell_command_pattern_with_pipes():
     assert cmd == "ls"
     assert wd == "/tmp"
 
+    # Commands after a pipe are ignored, but a later compound sub-command is not
+    cmd, wd = _extract_shell_command_info("ls | grep x; cd build&&make")
+    assert cmd == "ls"
+    assert wd is None
+
+    cmd, wd = _extract_shell_command_info("cd src | cat; cd /tmp && python a.py | tee log")
+    assert cmd == "python"
+    assert wd == "/tmp"
+
+
+def test_shell_command_pattern_quoted_directory():
+    """Test that a quoted cd target is kept as one path."""
+    import platform
+
+    from patchpal.tools.shell_tools import _extract_shell_command_info
+
+    if platform.system() == "Windows":
+        pytest.skip("POSIX quoting rules are not applied on Windows")
+
+    cmd, wd = _extract_shell_command_info('cd "my project" && python app.py')
+    assert cmd == "python"
+    assert wd == "my project"
+
 
 def test_shell_command_pattern_cd_only():
     """Test shell command pattern extraction for cd-only command."""
@@ -118,6 +141,23 @@ def test_shell_command_pattern_powershell():
     assert wd is None
 
 
+def test_shell_command_pattern_wrapper_with_leading_whitespace():
+    """Test that wrapper extraction is not thrown off by leading whitespace."""
+    from patchpal.tools.shell_tools import _extract_shell_command_info
+
+    cmd, wd = _extract_shell_command_info('  powershell -Command "Get-ChildItem"')
+    assert cmd == "get-childitem"
+    assert wd is None
+
+    cmd, wd = _extract_shell_command_info("  eval rm -rf build")
+    assert cmd == "rm -rf"
+    assert wd is None
+
+    cmd, wd = _extract_shell_command_info("  bash -c 'sed -n 1p file'")
+    assert cmd == "sed -n"
+    assert wd is None
+
+
 def test_shell_command_composite_pattern():
     """Test that run_shell creates correct composite patterns."""
     # We can't easily test run_shell directly due to permission prompts,
@@ -1,6 +1,25 @@
 """Tests for the repository map tool."""
 
-from patchpal.tools.repo_map import clear_repo_map_cache, get_repo_map, get_repo_map_stats
+from pathlib import Path
+
+import pytest
+
+from patchpal.tools import repo_map
+from patchpal.tools.repo_map import (
+    RepoMapCache,
+    clear_repo_map_cache,
+    get_repo_map,
+    get_repo_map_stats,
+)
+
+
+@pytest.fixture(autouse=True)
+def repo_map_cache_file(tmp_path, monkeypatch):
+    """Point the global repo map cache at a temp file instead of ~/.patchpal."""
+    cache_file = tmp_path / "repo_map_cache.json"
+    monkeypatch.setattr(repo_map, "REPO_MAP_CACHE_FILE", cache_file)
+    monkeypatch.setattr(repo_map, "_REPO_MAP_CACHE", RepoMapCache(cache_file))
+    return cache_file
 
 
 def test_get_repo_map_basic():
@@ -155,3 +174,195 @@ def test_get_repo_map_focus_files():
 
         # The focus file should appear in the output
         assert focus_file in focused_result
+
+
+def test_repo_map_cache_mtime_validation(tmp_path):
+    """Test that cached structures are only returned for a matching mtime."""
+    from patchpal.tools.repo_map import RepoMapCache
+
+    cache = RepoMapCache()
+    path = str(tmp_path / "example.py")
+
+    cache.set(path, 100.0, "def foo()")
+
+    assert cache.get(path, 100.0) == "def foo()"
+    assert cache.get(path, 200.0) is None
+    assert cache.get(str(tmp_path / "other.py"), 100.0) is None
+
+
+def test_walk_code_files_prunes_hidden_and_excluded(tmp_path):
+    """Test that the repo map walker skips hidden/excluded dirs and honors max_depth."""
+    from patchpal.tools.repo_map import _walk_code_files
+
+    (tmp_path / "top.py").write_text("x = 1\n")
+    (tmp_path / "notes.txt").write_text("not code\n")
+    (tmp_path / "pkg" / "sub").mkdir(parents=True)
+    (tmp_path / "pkg" / "mod.py").write_text("x = 1\n")
+    (tmp_path / "pkg" / "sub" / "deep.py").write_text("x = 1\n")
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".git" / "hook.py").write_text("x = 1\n")
+    (tmp_path / "node_modules").mkdir()
+    (tmp_path / "node_modules" / "lib.js").write_text("var x = 1;\n")
+
+    found = {
+        Path(rel_path).as_posix() for _, rel_path, _ in _walk_code_files(tmp_path, {"py", "js"})
+    }
+    assert found == {"top.py", "pkg/mod.py", "pkg/sub/deep.py"}
+
+    shallow = {
+        Path(rel_path).as_posix()
+        for _, rel_path, _ in _walk_code_files(tmp_path, {"py", "js"}, max_depth=1)
+    }
+    assert shallow == {"top.py", "pkg/mod.py"}
+
+
+def test_walk_code_files_follows_symlinked_dirs_once(tmp_path):
+    """Test that symlinked directories are walked, without looping on cycles."""
+    from patchpal.tools.repo_map import _walk_code_files
+
+    repo = tmp_path / "repo"
+    (repo / "src").mkdir(parents=True)
+    (repo / "src" / "app.py").write_text("x = 1\n")
+    vendored = tmp_path / "vendored"
+    vendored.mkdir()
+    (vendored / "lib.py").write_text("x = 1\n")
+
+    try:
+        (repo / "vendor").symlink_to(vendored, target_is_directory=True)
+        (repo / "src" / "loop").symlink_to(repo, target_is_directory=True)
+    except (OSError, NotImplementedError):
+        pytest.skip("symlinks not supported")
+
+    found = [Path(rel_path).as_posix() for _, rel_path, _ in _walk_code_files(repo, {"py"})]
+    assert sorted(found) == ["src/app.py", "vendor/lib.py"]
+
+
+def test_compile_glob_patterns_matches_pathlib_semantics():
+    """Test that compiled include/exclude globs behave like PurePath.match."""
+    from pathlib import PurePosixPath
+
+    from patchpal.tools.repo_map import _compile_glob_patterns
+
+    patterns = ["*.py", "*test*", "patchpal/tools/*.py", "[!t]*.js", "/abs/*.py"]
+    paths = [
+        "a.py",
+        "tests/helpers.py",
+        "tests/test_x.py",
+        "patchpal/tools/repo_map.py",
+        "tools/repo_map.py",
+        "b.js",
+        "t.js",
+        "abs/q.py",
+    ]
+
+    for pattern in patterns:
+        regex = _compile_glob_patterns([pattern])
+        for path in paths:
+            expected = PurePosixPath(path).match(pattern)
+            assert bool(regex.search(path)) == expected, (pattern, path)
+
+    assert _compile_glob_patterns(None) is None
+    assert _compile_glob_patterns([]) is None
+
+
+def test_repo_map_cache_persists_to_disk(tmp_path):
+    """Test that cache entries survive a save/load round trip."""
+    from patchpal.tools.repo_map import RepoMapCache
+
+    cache_file = tmp_path / "repo_map_cache.json"
+    cache = RepoMapCache(cache_file)
+    cache.set("src/app.py", 123.5, "def main()")
+    cache.save()
+
+    assert cache_file.exists()
+
+    reloaded = RepoMapCache(cache_file)
+    assert not reloaded.loaded
+    reloaded.load()
+
+    assert reloaded.loaded
+    assert reloaded.get("src/app.py", 123.5) == "def main()"
+    assert reloaded.get("src/app.py", 999.0) is None
+
+
+def test_repo_map_cache_ignores_incompatible_file(tmp_path):
+    """Test that a cache file with another schema version or bad JSON is ignored."""
+    import json
+
+    from patchpal.tools.repo_map import RepoMapCache
+
+    cache_file = tmp_path / "repo_map_cache.json"
+    cache_file.write_text(json.dumps({"version": -1, "entries": {"a.py": [1.0, "x"]}}))
+
+    cache = RepoMapCache(cache_file)
+    cache.load()
+    assert cache.cache == {}
+
+    cache_file.write_text("{not json")
+    cache = RepoMapCache(cache_file)
+    cache.load()
+    assert cache.cache == {}
+
+
+@pytest.mark.parametrize(
+    "entries",
+    [
+        [["a.py", 1.0, "x"]],
+        None,
+        {"a.py": [1.0]},
+        {"a.py": "x"},
+        {"a.py": [1.0, "x"], "b.py": [None, 2]},
+    ],
+    ids=["entries-list", "entries-null", "short-entry", "string-entry", "bad-types"],
+)
+def test_repo_map_ignores_malformed_cache_entries(repo_map_cache_file, entries):
+    """Test that a current-version cache file with malformed entries is discarded."""
+    import json
+
+    repo_map_cache_file.write_text(
+        json.dumps({"version": repo_map.REPO_MAP_CACHE_VERSION, "entries": entries})
+    )
+
+    cache = RepoMapCache(repo_map_cache_file)
+    cache.load()
+    assert cache.cache == {}
+
+    # The global cache recovers and rewrites the file on the next scan
+    result = get_repo_map(max_files=5)
+    assert "Repository Map" in result
+    assert isinstance(json.loads(repo_map_cache_file.read_text())["entries"], dict)
+
+
+def test_repo_map_cache_evicts_least_recently_used():
+    """Test that the cache is bounded and evicts the least recently used entry."""
+    from patchpal.tools.repo_map import RepoMapCache
+
+    cache = RepoMapCache(max_entries=2)
+    cache.set("a.py", 1.0, "a")
+    cache.set("b.py", 1.0, "b")
+
+    # Touch a.py so b.py becomes the least recently used entry
+    assert cache.get("a.py", 1.0) == "a"
+    cache.set("c.py", 1.0, "c")
+
+    assert len(cache.cache) == 2
+    assert cache.get("b.py", 1.0) is None
+    assert cache.get("a.py", 1.0) == "a"
+    assert cache.get("c.py", 1.0) == "c"
+
+
+def test_get_repo_map_cache_grows_to_fit_scan(tmp_path, repo_map_cache_file, monkeypatch):
+    """Test that a scan larger than max_entries does not evict its own entries."""
+    for name in ("a.py", "b.py", "c.py"):
+        (tmp_path / name).write_text("def f():\n    pass\n")
+
+    monkeypatch.setattr(repo_map, "REPO_ROOT", tmp_path)
+    monkeypatch.setattr(repo_map, "_summarize_structure", lambda rel_path: "def f()")
+    monkeypatch.setattr(
+        repo_map, "_REPO_MAP_CACHE", RepoMapCache(repo_map_cache_file, max_entries=2)
+    )
+
+    get_repo_map(max_files=10)
+
+    assert repo_map._REPO_MAP_CACHE.max_entries == 3
+    assert get_repo_map_stats()["cached_files"] == 3
@@ -35,6 +35,19 @@ def test_stream_renderer_basic():
     assert not renderer._running
 
 
+def test_stream_renderer_stop_wakes_render_thread():
+    """Test that stop() ends the render thread without waiting out the update interval."""
+    renderer = StreamRenderer()
+    renderer.UPDATE_INTERVAL = 10  # Far longer than stop()'s join timeout
+
+    renderer.start()
+    thread = renderer._thread
+    time.sleep(0.05)  # Let the thread reach its wait
+
+    renderer.stop()
+    assert not thread.is_alive()
+
+
 def test_stream_renderer_token_updates():
     """Test that token updates work correctly."""
     renderer = StreamRenderer(show_tokens=True)
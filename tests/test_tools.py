@@ -38,6 +38,16 @@ def temp_repo(monkeypatch):
         yield tmpdir_path
 
 
+@pytest.fixture
+def reconfigure_blocklist(monkeypatch):
+    """Return reconfigure_from_env, restoring the original command blocklist afterwards."""
+    import patchpal.tools.common as common
+
+    for name in ("DANGEROUS_TOKENS", "DANGEROUS_PATTERNS", "DANGEROUS_PATTERN_RE", "FORBIDDEN"):
+        monkeypatch.setattr(common, name, getattr(common, name))
+    return common.reconfigure_from_env
+
+
 def test_read_file(temp_repo):
     """Test reading a file."""
     from patchpal.tools import read_file
@@ -179,6 +189,19 @@ def test_read_file_xml(temp_repo):
     assert content == xml_content
 
 
+def test_read_file_known_text_extension_skips_mime_lookup(temp_repo):
+    """Test that known text extensions are read without MIME detection, SVG included."""
+    from patchpal.tools import read_file
+
+    svg_content = '<svg xmlns="http://www.w3.org/2000/svg"></svg>'
+    (temp_repo / "icon.svg").write_text(svg_content)
+
+    with patch("patchpal.tools.file_reading.mimetypes.guess_type") as guess_type:
+        assert read_file("subdir/file.py") == "print('test')"
+        assert read_file("icon.svg") == svg_content
+    guess_type.assert_not_called()
+
+
 def test_read_file_pdf(temp_repo):
     """Test reading PDF files with text extraction."""
     from patchpal.tools import read_file
@@ -369,6 +392,27 @@ def test_code_structure_max_symbols(temp_repo):
     # Won't show all 20 functions due to limit
 
 
+def test_code_structure_lines_match_formatted_output(temp_repo):
+    """Test that the compact symbol lines match code_structure's formatted body."""
+    from patchpal.tools import code_structure
+    from patchpal.tools.code_analysis import _code_structure_lines
+
+    (temp_repo / "shapes.py").write_text(
+        "class Square:\n    def area(self):\n        return 1\n\n\ndef make():\n    pass\n"
+    )
+
+    formatted = code_structure("shapes.py", max_symbols=20)
+    expected = [
+        line
+        for line in formatted.split("\n")
+        if line.strip() and not line.startswith(("💡", "File:"))
+    ]
+
+    assert list(_code_structure_lines("shapes.py", max_symbols=20)) == expected
+    assert "Classes (1):" in expected
+    assert "Functions (1):" in expected
+
+
 def test_code_structure_no_tree_sitter(temp_repo, monkeypatch):
     """Test code_structure gracefully handles missing tree-sitter."""
     # Mock tree-sitter as unavailable
@@ -462,6 +506,86 @@ def test_run_shell_with_output(temp_repo):
     assert "test.txt" in result
 
 
+def test_run_shell_includes_stderr_in_order(temp_repo):
+    """Test that stderr is captured along with stdout, in the order it was written."""
+    from patchpal.tools import run_shell
+
+    result = run_shell("echo first && echo second 1>&2 && echo third")
+    assert result.split() == ["first", "second", "third"]
+
+
+def test_output_filter_should_filter(monkeypatch):
+    """Test that filterable commands are matched anywhere in the command."""
+    from patchpal.tools.common import OutputFilter
+
+    monkeypatch.setenv("PATCHPAL_FILTER_OUTPUTS", "true")
+    assert OutputFilter.should_filter("pytest tests/")
+    assert OutputFilter.should_filter("cd app && python -m pytest -x")
+    assert OutputFilter.should_filter("git log --oneline")
+    assert not OutputFilter.should_filter("git status")
+    assert not OutputFilter.should_filter("ls -la")
+
+    monkeypatch.setenv("PATCHPAL_FILTER_OUTPUTS", "false")
+    assert not OutputFilter.should_filter("pytest tests/")
+
+
+def test_output_filter_keeps_test_failures_and_summary(monkeypatch):
+    """Test that filtered test output keeps failures and the summary line only."""
+    from patchpal.tools.common import OutputFilter
+
+    monkeypatch.setenv("PATCHPAL_FILTER_OUTPUTS", "true")
+    output = "\n".join(
+        [f"tests/test_a.py::test_{i} ok" for i in range(20)]
+        + ["tests/test_b.py::test_x FAILED", "E   assert 1 == 2", ""]
+        + ["==== 1 failed, 20 passed ===="]
+    )
+
+    result = OutputFilter.filter_output("pytest tests/", output)
+
+    assert result.startswith("[Filtered test output")
+    assert "test_x FAILED" in result
+    assert "assert 1 == 2" in result
+    assert "1 failed, 20 passed" in result
+    assert "test_a.py::test_0" not in result
+
+
+def test_simple_command_argv():
+    """Test that only plain commands are executed without a shell."""
+    import platform
+
+    from patchpal.tools.shell_tools import _simple_command_argv
+
+    # Shell syntax, assignments, builtins and relative paths always need a shell
+    for cmd in ["ls *.py", "echo $HOME", "ls | wc -l", "A=1 ls", "cd src", "./run.sh", "ls 'x"]:
+        assert _simple_command_argv(cmd) is None, cmd
+
+    # Builtins that also exist as binaries still run in the shell
+    for cmd in ["echo -e hi", "printf '%s' x", "test -d src", "pwd", "type ls", "true"]:
+        assert _simple_command_argv(cmd) is None, cmd
+
+    if platform.system() == "Windows":
+        assert _simple_command_argv("dir") is None
+    else:
+        assert _simple_command_argv("ls -la 'my file'") == ["ls", "-la", "my file"]
+
+
+def test_run_shell_builtin_output_matches_shell(temp_repo):
+    """Test that builtins like echo -e produce the same output as running them in the shell."""
+    import platform
+    import subprocess
+
+    from patchpal.tools import run_shell
+
+    if platform.system() == "Windows":
+        pytest.skip("POSIX shell builtins")
+
+    for cmd in ["echo -e 'a\\tb'", "echo -e hi", "printf '%s-%s' a b", "pwd"]:
+        expected = subprocess.run(
+            cmd, shell=True, capture_output=True, cwd=temp_repo, text=True
+        ).stdout
+        assert run_shell(cmd) == expected, cmd
+
+
 def test_run_shell_forbidden_commands(temp_repo):
     """Test that privilege escalation commands are blocked (platform-specific)."""
     import platform
@@ -479,7 +603,7 @@ def test_run_shell_forbidden_commands(temp_repo):
             run_shell(cmd)
 
 
-def test_run_shell_allow_sudo(temp_repo, monkeypatch):
+def test_run_shell_allow_sudo(temp_repo, monkeypatch, reconfigure_blocklist):
     """Test that sudo can be allowed via PATCHPAL_ALLOW_SUDO."""
     import platform
 
@@ -488,19 +612,8 @@ def test_run_shell_allow_sudo(temp_repo, monkeypatch):
     # Set environment variable to allow sudo
     monkeypatch.setenv("PATCHPAL_ALLOW_SUDO", "true")
 
-    # Need to reload the modules to pick up the new environment variable
-    import importlib
-
-    import patchpal.tools
-    import patchpal.tools.common
-    import patchpal.tools.shell_tools
-
-    importlib.reload(patchpal.tools.common)
-    importlib.reload(patchpal.tools.shell_tools)
-    importlib.reload(patchpal.tools)
-
-    # Re-patch REPO_ROOT after reload
-    monkeypatch.setattr("patchpal.tools.common.REPO_ROOT", temp_repo)
+    # Rebuild the command blocklist to pick up the new environment variable
+    reconfigure_blocklist()
 
     if platform.system() != "Windows":
         # On Unix-like systems, sudo should now be allowed (will fail but not blocked)
@@ -535,7 +648,7 @@ def test_run_shell_complex_safe_command(temp_repo):
     assert "3" in result or "count.txt" in result
 
 
-def test_run_shell_dangerous_patterns_blocked(temp_repo, monkeypatch):
+def test_run_shell_dangerous_patterns_blocked(temp_repo, monkeypatch, reconfigure_blocklist):
     """Test that dangerous patterns are blocked by default."""
     import platform
 
@@ -544,19 +657,8 @@ def test_run_shell_dangerous_patterns_blocked(temp_repo, monkeypatch):
     # Disable permission prompts for this test
     monkeypatch.setenv("PATCHPAL_REQUIRE_PERMISSION", "false")
 
-    # Need to reload the modules to pick up the new environment variable
-    import importlib
-
-    import patchpal.tools
-    import patchpal.tools.common
-    import patchpal.tools.shell_tools
-
-    importlib.reload(patchpal.tools.common)
-    importlib.reload(patchpal.tools.shell_tools)
-    importlib.reload(patchpal.tools)
-
-    # Re-patch REPO_ROOT after reload
-    monkeypatch.setattr("patchpal.tools.common.REPO_ROOT", temp_repo)
+    # Rebuild the command blocklist to pick up the new environment variable
+    reconfigure_blocklist()
 
     # Platform-specific dangerous commands
     if platform.system() == "Windows":
@@ -583,7 +685,9 @@ def test_run_shell_dangerous_patterns_blocked(temp_repo, monkeypatch):
             run_shell(cmd)
 
 
-def test_run_shell_dangerous_patterns_allowed_with_sudo_flag(temp_repo, monkeypatch):
+def test_run_shell_dangerous_patterns_allowed_with_sudo_flag(
+    temp_repo, monkeypatch, reconfigure_blocklist
+):
     """Test that dangerous patterns are allowed when PATCHPAL_ALLOW_SUDO=true."""
     from patchpal.tools import run_shell
 
@@ -591,19 +695,8 @@ def test_run_shell_dangerous_patterns_allowed_with_sudo_flag(temp_repo, monkeypa
     monkeypatch.setenv("PATCHPAL_ALLOW_SUDO", "true")
     monkeypatch.setenv("PATCHPAL_REQUIRE_PERMISSION", "false")
 
-    # Need to reload the modules to pick up the new environment variable
-    import importlib
-
-    import patchpal.tools
-    import patchpal.tools.common
-    import patchpal.tools.shell_tools
-
-    importlib.reload(patchpal.tools.common)
-    importlib.reload(patchpal.tools.shell_tools)
-    importlib.reload(patchpal.tools)
-
-    # Re-patch REPO_ROOT after reload
-    monkeypatch.setattr("patchpal.tools.common.REPO_ROOT", temp_repo)
+    # Rebuild the command blocklist to pick up the new environment variable
+    reconfigure_blocklist()
 
     # These commands should NOT be blocked by dangerous checks anymore
     # Test that previously blocked commands now execute (or fail for other reasons)
@@ -679,6 +772,16 @@ def test_web_fetch_invalid_url():
         web_fetch("not-a-url")
 
 
+def test_detect_binary_magic_numbers():
+    """Test that binary content is identified by its signature before Content-Type."""
+    from patchpal.tools.web_tools import _detect_binary
+
+    assert _detect_binary(b"\x89PNG\r\n\x1a\n....", "text/html") == (True, "PNG image")
+    assert _detect_binary(b"\xff\xd8\xff\xe0", "text/plain") == (True, "JPEG image")
+    assert _detect_binary(b"<html></html>", "image/png") == (True, "Content-Type: image/png")
+    assert _detect_binary(b"<html></html>", "text/html") == (False, None)
+
+
 def test_url_extraction_with_punctuation():
     """Test that URLs followed by punctuation are extracted correctly."""
     from patchpal.tools.web_tools import URLContextTracker
@@ -872,6 +975,126 @@ def test_edit_file_multiple_matches(temp_repo):
         edit_file("edit_test.txt", "test", "replaced")
 
 
+def test_edit_file_overlapping_match_is_unique(temp_repo):
+    """Test that an overlapping repeat is not counted as a second occurrence."""
+    from patchpal.tools import edit_file
+
+    (temp_repo / "edit_test.txt").write_text("aaa")
+
+    edit_file("edit_test.txt", "aa", "X")
+    assert (temp_repo / "edit_test.txt").read_text() == "Xa"
+
+
+def test_edit_file_writes_atomically(temp_repo, monkeypatch):
+    """Test that edits replace the file atomically, keep its mode, and leave no temp files."""
+    import os
+    import stat
+
+    from patchpal.tools import edit_file
+
+    target = temp_repo / "edit_test.txt"
+    target.write_text("Hello World")
+    target.chmod(0o640)
+
+    edit_file("edit_test.txt", "Hello", "Goodbye")
+    assert target.read_text() == "Goodbye World"
+    assert stat.S_IMODE(target.stat().st_mode) == 0o640
+
+    def failing_replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr("patchpal.tools.file_writing.os.replace", failing_replace)
+    with pytest.raises(OSError, match="disk full"):
+        edit_file("edit_test.txt", "Goodbye", "Hello")
+
+    # The original content survives and the temp file is cleaned up
+    assert target.read_text() == "Goodbye World"
+    assert not [name for name in os.listdir(temp_repo) if name.endswith(".tmp")]
+
+
+def test_write_file_new_file_honors_umask(temp_repo):
+    """Test that a newly written file gets the default mode from the process umask."""
+    import os
+    import platform
+    import stat
+
+    from patchpal.tools import write_file
+
+    if platform.system() == "Windows":
+        pytest.skip("POSIX permissions")
+
+    old_umask = os.umask(0o027)
+    try:
+        write_file("new_file.txt", "content")
+    finally:
+        os.umask(old_umask)
+
+    assert stat.S_IMODE((temp_repo / "new_file.txt").stat().st_mode) == 0o640
+
+
+def test_edit_file_keeps_hard_links(temp_repo):
+    """Test that editing a hard-linked file updates it in place instead of breaking the link."""
+    import os
+
+    from patchpal.tools import edit_file
+
+    target = temp_repo / "edit_test.txt"
+    target.write_text("Hello World")
+    try:
+        os.link(target, temp_repo / "linked.txt")
+    except (OSError, NotImplementedError):
+        pytest.skip("hard links not supported")
+    inode = target.stat().st_ino
+
+    edit_file("edit_test.txt", "Hello", "Goodbye")
+
+    assert target.stat().st_ino == inode
+    assert (temp_repo / "linked.txt").read_text() == "Goodbye World"
+
+
+def test_edit_file_unwritable_directory_writes_in_place(temp_repo, monkeypatch):
+    """Test that a writable file in a directory without write access can still be edited."""
+    import os
+
+    from patchpal.tools import edit_file
+
+    target = temp_repo / "edit_test.txt"
+    target.write_text("Hello World")
+
+    real_open = os.open
+
+    def open_without_dir_write(path, flags, mode=0o777, **kwargs):
+        if str(path).endswith(".tmp"):
+            raise PermissionError(13, "Permission denied", str(path))
+        return real_open(path, flags, mode, **kwargs)
+
+    monkeypatch.setattr("patchpal.tools.file_writing.os.open", open_without_dir_write)
+
+    edit_file("edit_test.txt", "Hello", "Goodbye")
+    assert target.read_text() == "Goodbye World"
+
+
+def test_edit_file_keeps_owner_and_group(temp_repo):
+    """Test that replacing a file owned by another user keeps its owner and group."""
+    import os
+    import platform
+
+    from patchpal.tools import edit_file
+
+    if platform.system() == "Windows" or os.geteuid() != 0:
+        pytest.skip("changing file ownership requires root")
+
+    target = temp_repo / "edit_test.txt"
+    target.write_text("Hello World")
+    os.chown(target, 12345, 12345)
+
+    edit_file("edit_test.txt", "Hello", "Goodbye")
+
+    st = target.stat()
+    assert (st.st_uid, st.st_gid) == (12345, 12345)
+    assert target.read_text() == "Goodbye World"
+
+
 def test_web_fetch_no_truncation(temp_repo, monkeypatch):
     """Test that web_fetch returns content without web-specific truncation.
 
@@ -1914,3 +2137,16 @@ def test_web_fetch_pdf_without_pymupdf(monkeypatch):
     result = web_fetch("https://example.com/test.pdf")
     # Should return error message when PyMuPDF is not available
     assert "PDF extraction not available" in result or "pymupdf not installed" in result
+
+
+def test_importing_tools_does_not_load_agent():
+    """Test that importing patchpal.tools does not load the agent or heavy optional libraries."""
+    import subprocess
+    import sys
+
+    heavy = {"litellm", "patchpal.agent", "pymupdf", "docx", "pptx", "tree_sitter_language_pack"}
+    code = f"import sys, patchpal.tools; print(sorted({heavy!r} & set(sys.modules)))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[]"